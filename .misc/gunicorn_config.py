@@ -2,6 +2,9 @@
 import os
 
 workers = os.environ.get("WEB_CONCURRENCY", 4)
+# Live updates streams of outage detail pages hold one thread each,
+# at most OUTAGE_STREAMS_PER_WORKER of them.
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
 
 bind = ":8000"
 
@@ -0,0 +1,303 @@
+"""Compaction and cold archival of history tables.
+
+`compact` removes history rows identical to the previous version and moves
+rows older than `HISTORY_ARCHIVE_AFTER_DAYS` into gzipped JSONL files, one
+file per object in `HISTORY_ARCHIVE_DIR`. Archived rows are stored with all
+tracked fields filled in, so they can be read without the hot table.
+`get_versions` returns archived versions together with the hot ones.
+
+Duplicates are always removed. Nothing is archived until
+`HISTORY_ARCHIVE_DIR` is configured, archived rows are deleted from the
+database and the directory has to outlive deployments.
+"""
+from dataclasses import dataclass
+from datetime import timedelta
+import gzip
+import json
+import logging
+import os
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Count, Exists, OuterRef, Q
+from django.utils import timezone
+
+from .history import get_state, materialize
+from .models import MonitorHistory, OutageHistory, SolutionHistory
+
+logger = logging.getLogger(__name__)
+
+# Rows younger than this are never compacted, announcement tasks may still
+# compare them.
+COMPACT_MIN_AGE = timedelta(days=1)
+# Number of latest rows of every object always kept in the hot table.
+KEEP_LATEST = 2
+
+
+@dataclass(frozen=True)
+class HistorySpec:
+    name: str
+    model: type
+    owner: str
+    timestamp: str
+    delta_encoded: bool = True
+
+
+HISTORIES = {
+    spec.name: spec
+    for spec in (
+        HistorySpec("outage", OutageHistory, "outage_id", "timestamp"),
+        HistorySpec("solution", SolutionHistory, "solution_id", "created"),
+        HistorySpec(
+            "monitor", MonitorHistory, "monitor_id", "timestamp", delta_encoded=False
+        ),
+    )
+}
+
+
+def get_archive_path(spec, object_id):
+    return os.path.join(
+        settings.HISTORY_ARCHIVE_DIR, spec.name, f"{object_id}.jsonl.gz"
+    )
+
+
+def serialize(row):
+    data = {
+        field.attname: field.value_from_object(row)
+        for field in row._meta.concrete_fields
+    }
+    return json.dumps(data, cls=DjangoJSONEncoder)
+
+
+def deserialize(spec, line):
+    data = json.loads(line)
+    return spec.model(
+        **{
+            field.attname: field.to_python(data[field.attname])
+            for field in spec.model._meta.concrete_fields
+            if field.attname in data
+        }
+    )
+
+
+def write_archive(spec, object_id, rows):
+    path = get_archive_path(spec, object_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Appending creates new gzip member, gzip reads them as one stream.
+    with gzip.open(path, "at", encoding="utf-8") as archive:
+        for row in rows:
+            archive.write(serialize(row) + "\n")
+
+
+def read_archive(spec, object_id):
+    """Return archived versions of object, ordered from the oldest."""
+    if not settings.HISTORY_ARCHIVE_DIR:
+        return []
+    path = get_archive_path(spec, object_id)
+    if not os.path.exists(path):
+        return []
+    rows = {}
+    with gzip.open(path, "rt", encoding="utf-8") as archive:
+        for line in archive:
+            row = deserialize(spec, line)
+            # Row may be archived twice if deleting it failed.
+            rows[row.pk] = row
+    return [rows[pk] for pk in sorted(rows)]
+
+
+def load_modified_by(rows):
+    """Set `modified_by` of archived rows, users are loaded by single query."""
+    users = get_user_model().objects.in_bulk(
+        {row.modified_by_id for row in rows if row.modified_by_id}
+    )
+    for row in rows:
+        row.modified_by = users.get(row.modified_by_id)
+
+
+def get_versions(spec_name, object_id, archived=False):
+    """Return versions of object ordered from the latest.
+
+    Archived versions are read from the archive file only if requested.
+    """
+    spec = HISTORIES[spec_name]
+    rows = list(
+        spec.model.objects.filter(**{spec.owner: object_id})
+        .select_related("modified_by")
+        .order_by("pk")
+    )
+    if spec.delta_encoded:
+        materialize(rows)
+    if archived:
+        archived_rows = read_archive(spec, object_id)
+        load_modified_by(archived_rows)
+        rows = archived_rows + rows
+    return rows[::-1]
+
+
+def find_redundant(spec, rows, before):
+    """Return rows identical to previous version, except the latest one."""
+    fields = spec.model.HISTORY_FIELDS
+    redundant = []
+    previous = None
+    for row in rows[:-1]:
+        state = get_state(row, fields)
+        if (
+            state == previous
+            and not getattr(row, "change_desc", None)
+            and getattr(row, spec.timestamp) < before
+        ):
+            redundant.append(row)
+        previous = state
+    return redundant
+
+
+def rebase(rows):
+    """Turn delta rows into checkpoints where the chain got too long.
+
+    Rows are materialized and ordered from the oldest, the first one
+    always becomes a checkpoint. Return updated rows.
+    """
+    updated = []
+    since_checkpoint = None
+    for row in rows:
+        if row.checkpoint:
+            since_checkpoint = 0
+        elif (
+            since_checkpoint is None
+            or since_checkpoint >= settings.HISTORY_CHECKPOINT_INTERVAL
+        ):
+            row.checkpoint = True
+            updated.append(row)
+            since_checkpoint = 0
+        else:
+            since_checkpoint += 1
+    return updated
+
+
+@transaction.atomic
+def compact_object(spec, object_id, now):
+    """Compact and archive history of single object, return counts."""
+    rows = list(
+        spec.model.objects.select_for_update()
+        .filter(**{spec.owner: object_id})
+        .order_by("pk")
+    )
+    if spec.delta_encoded:
+        materialize(rows)
+    redundant = {row.pk for row in find_redundant(spec, rows, now - COMPACT_MIN_AGE)}
+    rows = [row for row in rows if row.pk not in redundant]
+
+    archived = []
+    if settings.HISTORY_ARCHIVE_DIR:
+        horizon = now - timedelta(days=settings.HISTORY_ARCHIVE_AFTER_DAYS)
+        archived = [
+            row for row in rows[:-KEEP_LATEST] if getattr(row, spec.timestamp) < horizon
+        ]
+    if archived:
+        write_archive(spec, object_id, archived)
+    rows = rows[len(archived) :]
+
+    spec.model.objects.filter(pk__in=redundant | {row.pk for row in archived}).delete()
+    if spec.delta_encoded:
+        fields = ["checkpoint", *spec.model.HISTORY_FIELDS]
+        spec.model.objects.bulk_update(rebase(rows), fields)
+    return len(redundant), len(archived)
+
+
+def get_duplicate_objects(spec, before):
+    """Return IDs of objects having redundant rows older than `before`.
+
+    Delta row without changed fields repeats the previous version, full
+    snapshots are compared with the previous row in the database.
+    """
+    if not spec.delta_encoded:
+        return get_duplicate_snapshot_objects(spec, before)
+    model = spec.model
+    newer = model.objects.filter(
+        **{spec.owner: OuterRef(spec.owner), "pk__gt": OuterRef("pk")}
+    )
+    rows = model.objects.filter(
+        Exists(newer),
+        checkpoint=False,
+        changed_fields=[],
+        **{f"{spec.timestamp}__lt": before},
+    )
+    if any(field.name == "change_desc" for field in model._meta.concrete_fields):
+        rows = rows.filter(Q(change_desc__isnull=True) | Q(change_desc=""))
+    return set(rows.order_by().values_list(spec.owner, flat=True).distinct())
+
+
+def get_duplicate_snapshot_objects(spec, before):
+    opts = spec.model._meta
+    owner = opts.get_field(spec.owner).column
+    timestamp = opts.get_field(spec.timestamp).column
+    columns = [opts.get_field(field).column for field in spec.model.HISTORY_FIELDS]
+    same = " AND ".join(
+        f"{column} IS NOT DISTINCT FROM LAG({column}) OVER w" for column in columns
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT DISTINCT {owner} FROM (
+                SELECT {owner}, {timestamp},
+                    LAG(id) OVER w IS NOT NULL AND {same} AS duplicate,
+                    LEAD(id) OVER w IS NOT NULL AS has_newer
+                FROM {opts.db_table}
+                WHERE {owner} IS NOT NULL
+                WINDOW w AS (PARTITION BY {owner} ORDER BY id)
+            ) h
+            WHERE duplicate AND has_newer AND {timestamp} < %s
+            """,
+            [before],
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+
+def get_archivable_objects(spec, horizon):
+    """Return IDs of objects having rows to archive, by single query.
+
+    Rows older than `horizon` are archived, except `KEEP_LATEST` rows.
+    """
+    timestamp = spec.timestamp
+    return list(
+        spec.model.objects.exclude(**{spec.owner: None})
+        .order_by()
+        .values(spec.owner)
+        .annotate(
+            total=Count("pk"),
+            old=Count("pk", filter=Q(**{f"{timestamp}__lt": horizon})),
+        )
+        .filter(old__gt=0, total__gt=KEEP_LATEST)
+        .values_list(spec.owner, flat=True)
+    )
+
+
+def compact(spec_names=None):
+    """Compact history of objects having duplicate rows or rows to archive.
+
+    Objects are selected in the database, so the work grows with the number
+    of redundant and archivable rows, not with the whole history.
+    """
+    if not settings.HISTORY_ARCHIVE_DIR:
+        logger.warning("HISTORY_ARCHIVE_DIR is not configured, skipping archival")
+    now = timezone.now()
+    horizon = now - timedelta(days=settings.HISTORY_ARCHIVE_AFTER_DAYS)
+    totals = {}
+    for name in spec_names or HISTORIES:
+        spec = HISTORIES[name]
+        object_ids = get_duplicate_objects(spec, now - COMPACT_MIN_AGE)
+        if settings.HISTORY_ARCHIVE_DIR:
+            object_ids.update(get_archivable_objects(spec, horizon))
+        removed = archived = 0
+        for object_id in sorted(object_ids):
+            object_removed, object_archived = compact_object(spec, object_id, now)
+            removed += object_removed
+            archived += object_archived
+        logger.info(
+            f"Compacted {name} history: {removed} duplicates removed, "
+            f"{archived} rows archived"
+        )
+        totals[name] = removed, archived
+    return totals
@@ -13,3 +13,5 @@ app.conf.broker_transport_options = {
     "interval_step": 0.2,
     "interval_max": 0.2,
 }
+
+from . import task_monitoring  # pylint: disable=wrong-import-position,unused-import
@@ -0,0 +1,167 @@
+"""Delta-encoded history of outages and solutions.
+
+History row stores only fields changed by the save (`changed_fields`),
+other tracked fields are NULL. Every `HISTORY_CHECKPOINT_INTERVAL`-th row
+is a checkpoint holding full copy of all tracked fields, so any version
+is reconstructed from the nearest older checkpoint and deltas after it.
+
+Tracked fields are listed in `HISTORY_FIELDS` of the history model,
+foreign keys by their attnames.
+"""
+from django.conf import settings
+
+
+def get_state(row, fields):
+    return {field: getattr(row, field) for field in fields}
+
+
+def get_foreign_keys(row):
+    fields = set(row.HISTORY_FIELDS)
+    return [
+        field
+        for field in row._meta.concrete_fields
+        if field.is_relation and field.attname in fields
+    ]
+
+
+def materialize(rows):
+    """Fill tracked fields of rows ordered from the oldest.
+
+    The first row has to be a checkpoint. Rows are updated in place
+    and returned. Related objects loaded by `select_related` are copied
+    together with their foreign keys, so they are not loaded again.
+    """
+    state = None
+    related = {}
+    for row in rows:
+        fields = row.HISTORY_FIELDS
+        foreign_keys = get_foreign_keys(row)
+        if row.checkpoint:
+            state = get_state(row, fields)
+            changed = fields
+        elif state is None:
+            raise ValueError(f"History of {row} does not start with checkpoint")
+        else:
+            state.update(get_state(row, row.changed_fields))
+            changed = row.changed_fields
+        for field in foreign_keys:
+            if field.attname in changed:
+                related[field.name] = field.get_cached_value(row, default=None)
+        for field, value in state.items():
+            setattr(row, field, value)
+        for field in foreign_keys:
+            value = related.get(field.name)
+            if value is not None and value.pk == getattr(row, field.attname):
+                field.set_cached_value(row, value)
+            elif field.is_cached(row):
+                field.delete_cached_value(row)
+    return rows
+
+
+def load_rows(history, count):
+    """Return `count` latest rows preceded by checkpoint, from the oldest.
+
+    Rows since the last checkpoint are normally loaded by single query,
+    whole history is loaded only when checkpoint is missing.
+    """
+    limit = count + settings.HISTORY_CHECKPOINT_INTERVAL
+    rows = list(history.order_by("-pk")[:limit])[::-1]
+    checkpoints = [
+        i
+        for i, row in enumerate(rows[: max(len(rows) - count, 0) + 1])
+        if row.checkpoint
+    ]
+    if checkpoints:
+        return rows[checkpoints[-1] :]
+    if len(rows) < limit:
+        return rows
+    return list(history.order_by("pk"))
+
+
+def latest_versions(history, count=2):
+    """Return up to `count` latest versions, ordered from the latest."""
+    rows = materialize(load_rows(history, count))
+    return rows[-count:][::-1]
+
+
+def get_version(history, pk):
+    """Return version saved in history row `pk`."""
+    return latest_versions(history.filter(pk__lte=pk), count=1)[0]
+
+
+def build_version(rows):
+    """Return the latest version from rows ending with checkpoint or None."""
+    rows = sorted(rows, key=lambda row: row.pk)
+    checkpoints = [i for i, row in enumerate(rows) if row.checkpoint]
+    if not checkpoints:
+        return None
+    return materialize(rows[checkpoints[-1] :])[-1]
+
+
+def version_as_of(history, timestamp, field="timestamp"):
+    """Return version valid at `timestamp`, None if there's none in history.
+
+    `field` is the creation time of history rows. Single index range scan
+    reading at most one checkpoint interval of rows, rows created at the
+    same time are ordered by pk, as the deltas are.
+    """
+    limit = settings.HISTORY_CHECKPOINT_INTERVAL + 1
+    rows = history.filter(**{f"{field}__lte": timestamp})
+    rows = rows.order_by(f"-{field}", "-pk")[:limit]
+    return build_version(rows)
+
+
+def versions_as_of(model, owner, owner_ids, timestamp, field="timestamp"):
+    """Return versions valid at `timestamp` by owner ID, using single query.
+
+    `owner` is column of the owning object, `field` the creation time of
+    history rows. (`owner`, `field`, pk) index is scanned once per owner
+    (LATERAL join).
+    """
+    opts = model._meta
+    column = opts.get_field(field).column
+    pk = opts.pk.column
+    rows = model.objects.raw(
+        f"""
+        SELECT h.* FROM unnest(%s::integer[]) AS owner(id)
+        CROSS JOIN LATERAL (
+            SELECT * FROM {opts.db_table}
+            WHERE {owner} = owner.id AND {column} <= %s
+            ORDER BY {column} DESC, {pk} DESC LIMIT %s
+        ) h
+        """,
+        [list(owner_ids), timestamp, settings.HISTORY_CHECKPOINT_INTERVAL + 1],
+    )
+    by_owner = {}
+    for row in rows:
+        by_owner.setdefault(getattr(row, owner), []).append(row)
+    return {owner_id: build_version(rows) for owner_id, rows in by_owner.items()}
+
+
+def has_history_changes(dirty_fields, history_model):
+    """Check if any tracked field is dirty, None means new object."""
+    if dirty_fields is None:
+        return True
+    return bool(set(dirty_fields) & set(history_model.HISTORY_FIELDS))
+
+
+def record_version(instance, history, **extra):
+    """Append new version of instance to its `history` related manager.
+
+    Only fields which differ from the latest version are stored, unless
+    a checkpoint is due.
+    """
+    fields = history.model.HISTORY_FIELDS
+    state = get_state(instance, fields)
+    rows = list(history.order_by("-pk")[: settings.HISTORY_CHECKPOINT_INTERVAL])
+    checkpoints = [i for i, row in enumerate(rows) if row.checkpoint]
+    if not checkpoints:
+        return history.create(checkpoint=True, changed_fields=[], **state, **extra)
+    previous = get_state(materialize(rows[checkpoints[0] :: -1])[-1], fields)
+    changed_fields = [field for field in fields if state[field] != previous[field]]
+    return history.create(
+        checkpoint=False,
+        changed_fields=changed_fields,
+        **{field: state[field] for field in changed_fields},
+        **extra,
+    )
@@ -0,0 +1,209 @@
+"""Live updates of outage detail page.
+
+Saving outage, solution or notification publishes only changed values
+to Redis channel of the outage after the transaction is committed.
+`stream` relays them to browsers as server-sent events, one stream per
+open outage detail page. Changes which alter layout of the page publish
+`reload` event instead.
+
+Streams are served by regular web server threads, so only
+`OUTAGE_STREAMS_PER_WORKER` of them are open in one process at a time.
+Pages over the limit get `busy` event and fall back to periodic refresh.
+"""
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from .redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Browser reconnects after this delay (milliseconds) when stream ends.
+RECONNECT_DELAY = 1000
+# Comment sent to idle stream (seconds), so proxies do not close it.
+KEEPALIVE_INTERVAL = 15
+# Page without stream is refreshed after this number of seconds.
+BUSY_REFRESH_INTERVAL = 60
+
+open_streams = 0
+open_streams_lock = threading.Lock()
+
+
+def user_link(user):
+    if user is None:
+        return {"text": "", "href": ""}
+    try:
+        href = user.profile.slack_link
+    except ObjectDoesNotExist:
+        href = ""
+    return {"text": user.email or user.username, "href": href}
+
+
+def timestamp(value):
+    return value.timestamp() if value else ""
+
+
+# Changed attname -> elements of page and their new values.
+OUTAGE_VALUES = {
+    "summary": {"summary": lambda outage: outage.summary},
+    "eta": {"eta": lambda outage: outage.eta},
+    "eta_deadline": {"eta_remaining": lambda outage: outage.eta_remaining},
+    "started_at": {"started_at": lambda outage: timestamp(outage.started_at)},
+    "systems_affected_id": {
+        "systems_affected": lambda outage: outage.systems_affected_human
+    },
+    "sales_affected_choice": {
+        "sales_affected_choice": lambda outage: outage.sales_affected_choice_human
+    },
+    "b2b_partners_affected_choice": {
+        "b2b_partners_affected_choice": (
+            lambda outage: outage.b2b_partner_affected_choice_human
+        )
+    },
+    "sales_affected": {"sales_affected": lambda outage: outage.sales_affected},
+    "solution_assignee_id": {
+        "solution_assignee": lambda outage: user_link(outage.solution_assignee)
+    },
+    "communication_assignee_id": {
+        "communication_assignee": (
+            lambda outage: user_link(outage.communication_assignee)
+        )
+    },
+}
+OUTAGE_RELOAD_FIELDS = {"resolved"}
+
+SOLUTION_VALUES = {
+    "summary": {"solution_summary": lambda solution: solution.summary},
+    "resolved_at": {"resolved_at": lambda solution: timestamp(solution.resolved_at)},
+    "suggested_outcome": {
+        "suggested_outcome": lambda solution: solution.suggested_outcome_human
+    },
+    "created_by_id": {"resolved_by": lambda solution: user_link(solution.created_by)},
+}
+SOLUTION_RELOAD_FIELDS = {"report_url"}
+
+
+def get_channel(outage_id):
+    return f"outage:{outage_id}"
+
+
+def format_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+def send(outage_id, event, get_data):
+    channel = get_channel(outage_id)
+    try:
+        get_redis().publish(channel, format_event(event, get_data()))
+    except Exception:  # pylint: disable=broad-except
+        # Saving of the change is already committed, do not break it.
+        logger.exception(f"Publishing live update to {channel} failed")
+
+
+def publish(outage_id, event, get_data):
+    """Publish event once the transaction is committed.
+
+    Data are read by `get_data` after the commit, rolled back changes
+    are never published.
+    """
+    transaction.on_commit(lambda: send(outage_id, event, get_data))
+
+
+def get_values(instance, fields, values):
+    data = {}
+    for field in fields:
+        for element, value in values.get(field, {}).items():
+            data[element] = value(instance)
+    return data
+
+
+def publish_changes(outage_id, instance, dirty, values, reload_fields):
+    """Publish new values of `dirty` fields, None means new object."""
+    if dirty is None or set(dirty) & reload_fields:
+        publish(outage_id, "reload", dict)
+    elif set(dirty) & values.keys():
+        publish(outage_id, "values", lambda: get_values(instance, dirty, values))
+
+
+def publish_outage_changes(outage, dirty):
+    publish_changes(outage.pk, outage, dirty, OUTAGE_VALUES, OUTAGE_RELOAD_FIELDS)
+
+
+def publish_solution_changes(solution, dirty):
+    publish_changes(
+        solution.outage_id, solution, dirty, SOLUTION_VALUES, SOLUTION_RELOAD_FIELDS
+    )
+
+
+def get_notification(notification):
+    return {
+        "text": notification.text,
+        "created_by": notification.created_by.email if notification.created_by else "",
+        "created": notification.created.timestamp(),
+    }
+
+
+def publish_notifications(outage_id, notifications):
+    publish(
+        outage_id,
+        "notifications",
+        lambda: [get_notification(notification) for notification in notifications],
+    )
+
+
+def acquire_stream():
+    """Reserve stream slot of this process, return False if none is free."""
+    global open_streams  # pylint: disable=global-statement
+    with open_streams_lock:
+        if open_streams >= settings.OUTAGE_STREAMS_PER_WORKER:
+            return False
+        open_streams += 1
+        return True
+
+
+def release_stream():
+    global open_streams  # pylint: disable=global-statement
+    with open_streams_lock:
+        open_streams -= 1
+
+
+def stream(outage_id):
+    """Yield events of outage for `OUTAGE_STREAM_MAX_DURATION` seconds.
+
+    Stream occupies web worker thread, so it is closed regularly and
+    the browser reconnects. Without free stream slot only `busy` event
+    is sent, threads are left for other requests.
+    """
+    if not acquire_stream():
+        yield format_event("busy", {"refresh": BUSY_REFRESH_INTERVAL})
+        return
+    try:
+        yield from relay(outage_id)
+    finally:
+        release_stream()
+
+
+def relay(outage_id):
+    pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(get_channel(outage_id))
+    try:
+        yield f"retry: {RECONNECT_DELAY}\n\n"
+        now = last_sent = time.monotonic()
+        deadline = now + settings.OUTAGE_STREAM_MAX_DURATION
+        while now < deadline:
+            message = pubsub.get_message(timeout=1.0)
+            now = time.monotonic()
+            if message is not None:
+                yield message["data"].decode()
+                last_sent = now
+            elif now - last_sent >= KEEPALIVE_INTERVAL:
+                yield ": keep-alive\n\n"
+                last_sent = now
+    finally:
+        pubsub.close()
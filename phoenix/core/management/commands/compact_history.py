@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from ...archive import HISTORIES, compact
+
+
+class Command(BaseCommand):
+    help = "Remove duplicate history rows and archive old history to files"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "history",
+            nargs="*",
+            choices=list(HISTORIES),
+            help="Compact only given histories, all by default",
+        )
+
+    def handle(self, *args, **options):
+        for name, (removed, archived) in compact(options["history"]).items():
+            self.stdout.write(
+                f"{name}: {removed} duplicates removed, {archived} rows archived"
+            )
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from ...periodic import TASKS, get_runs, get_skipped
+
+
+class Command(BaseCommand):
+    help = "Show durations and item counts of recent runs of periodic tasks"
+
+    def handle(self, *args, **options):
+        skipped = get_skipped()
+        for name in sorted(TASKS):
+            runs = get_runs(name)
+            durations = [run["duration"] for run in runs]
+            items = [run["items"] for run in runs if run["items"] is not None]
+            self.stdout.write(
+                f"{name}: {len(runs)} runs, "
+                f"{sum(run['failed'] for run in runs)} failed, "
+                f"{skipped.get(name, 0)} ticks skipped, "
+                f"duration avg {sum(durations) / len(durations) if runs else 0:.3f}s "
+                f"max {max(durations, default=0):.3f}s, "
+                f"items max {max(items, default=0)}"
+            )
@@ -0,0 +1,17 @@
+# Generated by Django 3.0.2 on 2026-10-19 10:09
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0034_auto_20191223_0946"),
+        ("slackbot", "0004_slackoutboxmessage"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="postmortemnotifications", name="slack_notified"
+        )
+    ]
@@ -0,0 +1,168 @@
+# Generated by Django 3.0.2 on 2026-10-19 10:13
+
+from django.conf import settings
+import django.contrib.postgres.fields
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("core", "0035_remove_postmortemnotifications_slack_notified"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="outagehistory",
+            name="changed_fields",
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=models.CharField(max_length=50), default=list, size=None
+            ),
+        ),
+        migrations.AddField(
+            model_name="outagehistory",
+            name="checkpoint",
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name="solutionhistory",
+            name="changed_fields",
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=models.CharField(max_length=50), default=list, size=None
+            ),
+        ),
+        migrations.AddField(
+            model_name="solutionhistory",
+            name="checkpoint",
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AlterField(
+            model_name="outagehistory",
+            name="announce_on_slack",
+            field=models.BooleanField(default=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name="outagehistory",
+            name="b2b_partners_affected_choice",
+            field=models.CharField(
+                choices=[("Y", "yes"), ("N", "no"), ("UN", "unknown")],
+                default="UN",
+                max_length=2,
+                null=True,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="outagehistory",
+            name="communication_assignee",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="history_comunicate_outages",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="outagehistory",
+            name="created",
+            field=models.DateTimeField(default=django.utils.timezone.now, null=True),
+        ),
+        migrations.AlterField(
+            model_name="outagehistory",
+            name="created_by",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="history_outage_created",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="outagehistory",
+            name="eta",
+            field=models.CharField(
+                choices=[
+                    ("<30m", "<30m"),
+                    ("<2h", "<2h"),
+                    ("<8h", "<8h"),
+                    ("<24h", "<24h"),
+                    (">24h", ">24h"),
+                ],
+                max_length=6,
+                null=True,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="outagehistory",
+            name="lost_bookings_choice",
+            field=models.CharField(
+                choices=[
+                    ("0%", "0%"),
+                    ("<10%", "<10%"),
+                    ("<30%", "<30%"),
+                    ("<60%", "<60%"),
+                    ("<100%", "<100%"),
+                    ("100%", "100%"),
+                ],
+                max_length=5,
+                null=True,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="outagehistory",
+            name="resolved",
+            field=models.BooleanField(default=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name="outagehistory",
+            name="sales_affected_choice",
+            field=models.CharField(
+                choices=[("Y", "yes"), ("N", "no"), ("UN", "unknown")],
+                default="UN",
+                max_length=2,
+                null=True,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="outagehistory",
+            name="solution_assignee",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="history_solves_outages",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="outagehistory",
+            name="started_at",
+            field=models.DateTimeField(default=django.utils.timezone.now, null=True),
+        ),
+        migrations.AlterField(
+            model_name="outagehistory",
+            name="summary",
+            field=models.TextField(max_length=3000, null=True),
+        ),
+        migrations.AlterField(
+            model_name="solutionhistory",
+            name="resolved_at",
+            field=models.DateTimeField(default=django.utils.timezone.now, null=True),
+        ),
+        migrations.AlterField(
+            model_name="solutionhistory",
+            name="solving_time",
+            field=models.IntegerField(default=0, null=True),
+        ),
+        migrations.AlterField(
+            model_name="solutionhistory",
+            name="suggested_outcome",
+            field=models.CharField(
+                choices=[("PM", "Postmortem report"), ("NO", "None")],
+                default="NO",
+                max_length=2,
+                null=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.0.2 on 2026-10-19 10:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0036_history_checkpoints"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="outagehistory",
+            index=models.Index(
+                fields=["outage", "timestamp"], name="core_outagehistory_as_of_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 3.0.2 on 2026-10-19 10:24
+
+from datetime import timedelta
+import re
+
+from django.db import migrations, models
+
+ETA_RE = re.compile(r"<?(?P<value>\d+)(?P<granularity>[mh])")
+
+
+def fill_eta_deadline(apps, schema_editor):
+    Outage = apps.get_model("core", "Outage")
+    outages = []
+    for outage in Outage.objects.exclude(eta_last_modified=None).only(
+        "eta", "eta_last_modified"
+    ):
+        m = ETA_RE.match(outage.eta or "")
+        if not m:
+            continue
+        minutes = int(m.group("value")) * (60 if m.group("granularity") == "h" else 1)
+        outage.eta_deadline = outage.eta_last_modified + timedelta(minutes=minutes)
+        outages.append(outage)
+    Outage.objects.bulk_update(outages, ["eta_deadline"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0037_outagehistory_as_of_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="outage",
+            name="eta_deadline",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="outage",
+            index=models.Index(
+                condition=models.Q(resolved=False),
+                fields=["eta_deadline"],
+                name="core_outage_eta_deadline_idx",
+            ),
+        ),
+        migrations.RunPython(fill_eta_deadline, migrations.RunPython.noop),
+    ]
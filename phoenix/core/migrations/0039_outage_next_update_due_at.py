@@ -0,0 +1,42 @@
+# Generated by Django 3.0.2 on 2026-10-19 10:25
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Coalesce
+
+
+def fill_next_update_due_at(apps, schema_editor):
+    Outage = apps.get_model("core", "Outage")
+    Outage.objects.update(
+        next_update_due_at=Coalesce(
+            F("communication_assignee_last_notified"), F("created")
+        )
+        + timedelta(minutes=settings.NOTIFY_COMMUNICATION_ASSIGNEE_MINUTES)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0038_outage_eta_deadline"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="outage",
+            name="next_update_due_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="outage",
+            index=models.Index(
+                condition=models.Q(resolved=False),
+                fields=["next_update_due_at"],
+                name="core_outage_update_due_idx",
+            ),
+        ),
+        migrations.RunPython(fill_next_update_due_at, migrations.RunPython.noop),
+    ]
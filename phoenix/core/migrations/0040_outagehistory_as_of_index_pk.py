@@ -0,0 +1,23 @@
+# Generated by Django 3.0.2 on 2026-10-19 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0039_outage_next_update_due_at"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="outagehistory", name="core_outagehistory_as_of_idx",
+        ),
+        migrations.AddIndex(
+            model_name="outagehistory",
+            index=models.Index(
+                fields=["outage", "timestamp", "id"],
+                name="core_outagehistory_as_of_idx",
+            ),
+        ),
+    ]
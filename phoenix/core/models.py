@@ -1,13 +1,27 @@
+from datetime import timedelta
 import logging
 import re
 
 import arrow
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.fields import ArrayField
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import IntegrityError, models
 from django.utils import timezone
 
+from .history import (
+    has_history_changes,
+    record_version,
+    version_as_of,
+    versions_as_of,
+)
+from .live import (
+    publish_notifications,
+    publish_outage_changes,
+    publish_solution_changes,
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -16,6 +30,60 @@ USER_MODEL = settings.AUTH_USER_MODEL
 ETA_PARSE_RE = re.compile(r"(?P<symbol>[<>]?)(?P<value>\d+)(?P<granularity>\w{1})")
 
 
+class DirtyFieldsMixin:
+    """Track field values loaded from database.
+
+    Saving existing object writes only fields which changed since it was
+    loaded or last saved, unless `update_fields` are given explicitly.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def get_dirty_fields(self):
+        """Return attnames of changed fields, None if object is not saved yet."""
+        loaded = getattr(self, "_loaded_values", None)
+        if loaded is None or self._state.adding:
+            return None
+        dirty = []
+        for field in self._meta.concrete_fields:
+            attname = field.attname
+            if attname in loaded:
+                if getattr(self, attname) != loaded[attname]:
+                    dirty.append(attname)
+            elif attname in self.__dict__:
+                # Deferred field set explicitly.
+                dirty.append(attname)
+        return dirty
+
+    def save(self, *args, **kwargs):  # pylint: disable=arguments-differ
+        dirty = self.get_dirty_fields()
+        if dirty is not None and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = dirty
+        update_fields = kwargs.get("update_fields")
+        super().save(*args, **kwargs)
+        if update_fields is None:
+            saved = self._meta.concrete_fields
+        else:
+            # Fields left out stay dirty, so they are written by next save.
+            names = set(update_fields)
+            saved = [
+                field
+                for field in self._meta.concrete_fields
+                if field.name in names or field.attname in names
+            ]
+        loaded = getattr(self, "_loaded_values", None) or {}
+        loaded.update(
+            (field.attname, getattr(self, field.attname))
+            for field in saved
+            if field.attname in self.__dict__
+        )
+        self._loaded_values = loaded
+
+
 class Profile(models.Model):
     user = models.OneToOneField(USER_MODEL, on_delete=models.CASCADE)
     timezone = models.TextField(null=False, default="Etc/UTC")
@@ -139,16 +207,43 @@ class AbstractOutage(models.Model):
         return int(self.created.timestamp())
 
 
-class Outage(AbstractOutage):
+class OutageManager(models.Manager):
+    def as_of(self, timestamp, outage_ids):
+        """Return versions of outages at `timestamp` by outage ID.
+
+        Outages without any version at that time are left out. Archived
+        history is not searched, use `Outage.as_of` for that.
+        """
+        versions = versions_as_of(OutageHistory, "outage_id", outage_ids, timestamp)
+        return {pk: version for pk, version in versions.items() if version}
+
+
+class Outage(DirtyFieldsMixin, AbstractOutage):
+    objects = OutageManager()
+
+    # Fields used to compute sales_affected
+    SALES_AFFECTED_SOURCES = (
+        "lost_bookings",
+        "lost_bookings_choice",
+        "impact_on_turnover",
+    )
+
     # If outage isn't resolved ping communication assignee every X minutes.
     # This field holds the time of the last ping.
     communication_assignee_last_notified = models.DateTimeField(null=True, blank=True)
+    # When communication assignee should be asked for an update next time.
+    next_update_due_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # Computed from eta and eta_last_modified on save, see `get_eta_deadline`.
+    eta_deadline = models.DateTimeField(null=True, blank=True, editable=False)
 
     def __str__(self):
         return f"Outage {self.id}"
 
-    def communication_assignee_notified(self):
-        self.communication_assignee_last_notified = arrow.now().datetime
+    @staticmethod
+    def get_next_update_due_at(last_notified):
+        return last_notified + timedelta(
+            minutes=settings.NOTIFY_COMMUNICATION_ASSIGNEE_MINUTES
+        )
 
     @property
     def is_resolved(self):
@@ -163,6 +258,24 @@ class Outage(AbstractOutage):
     def is_reopened(self):
         return self.solution is not None and not self.resolved
 
+    def as_of(self, timestamp):
+        """Return `OutageHistory` version valid at `timestamp` or None.
+
+        Falls back to archived history when database has no version
+        that old.
+        """
+        version = version_as_of(self.history_outage, timestamp)
+        if version is None:
+            from .archive import HISTORIES, read_archive
+
+            archived = [
+                row
+                for row in read_archive(HISTORIES["outage"], self.pk)
+                if row.timestamp <= timestamp
+            ]
+            version = archived[-1] if archived else None
+        return version
+
     def set_eta(self, eta):
         """Properly sets eta. Never change eta manually.
 
@@ -185,34 +298,34 @@ class Outage(AbstractOutage):
         x = granularity_table[granularity]
         return int(value) * x
 
-    @property
-    def eta_deadline(self):
+    def get_eta_deadline(self):
+        """Compute deadline of current ETA, None if ETA is unknown."""
+        if not self.eta or not self.eta_last_modified:
+            return None
         eta_in_minutes = self.eta_in_minutes
         if not eta_in_minutes:
-            return ""
-        eta_last_modified = arrow.get(self.eta_last_modified)
-        return eta_last_modified.shift(minutes=eta_in_minutes)
+            return None
+        return self.eta_last_modified + timedelta(minutes=eta_in_minutes)
 
     @property
     def eta_remaining(self):
         """Calculate remaining ETA from now in minutes."""
-        eta_deadline = self.eta_deadline
-        if not eta_deadline:
+        if not self.eta_deadline:
             return ""
-        delta = eta_deadline - arrow.utcnow()
+        delta = self.eta_deadline - timezone.now()
         minutes = delta.total_seconds() // 60
         minutes = int(minutes)
         if minutes <= 0:
             return 0
         return minutes
 
-    def _make_assignee(self, user_last_name, column="solution_assignee"):
-        if not user_last_name:
+    def _make_assignee(self, slack_id, column="solution_assignee"):
+        if not slack_id:
             return
         try:
-            user = get_user_model().objects.get(last_name=user_last_name)
+            user = get_user_model().objects.get(slack_member__slack_id=slack_id)
         except get_user_model().DoesNotExist:
-            logger.error(f"Can't assign user: {user_last_name}")
+            logger.error(f"Can't assign user: {slack_id}")
             return
         setattr(self, column, user)
 
@@ -230,7 +343,13 @@ class Outage(AbstractOutage):
         self.systems_affected = system
 
     def add_notification(self, text, by_user):
-        self.notifications.create(text=text, created_by=by_user)
+        self.add_notifications([text], by_user)
+
+    def add_notifications(self, texts, by_user):
+        notifications = Notification.objects.bulk_create(
+            [Notification(outage=self, text=text, created_by=by_user) for text in texts]
+        )
+        publish_notifications(self.pk, notifications)
 
     def get_involved_users(self):
         """Return list of involved users."""
@@ -261,11 +380,17 @@ class Outage(AbstractOutage):
         )
 
     def save(self, *args, **kwargs):  # pylint: disable=arguments-differ
+        """Save changed fields, record history if tracked field changed.
+
+        History is recorded also when `change_desc` is provided.
+        """
         change_desc = kwargs.pop("change_desc", None)
         modified_by = kwargs.pop("modified_by", None)
         self.summary = self.summary.strip()
 
-        self.fill_sales_affected()
+        dirty = self.get_dirty_fields()
+        if dirty is None or set(dirty) & set(self.SALES_AFFECTED_SOURCES):
+            self.fill_sales_affected()
 
         if self.pk is None:
             try:
@@ -277,36 +402,63 @@ class Outage(AbstractOutage):
             except ObjectDoesNotExist:
                 self.solution_assignee = self.created_by
 
+        if dirty is None or {"eta", "eta_last_modified"} & set(dirty):
+            self.eta_deadline = self.get_eta_deadline()
+        if dirty is None and self.next_update_due_at is None:
+            self.next_update_due_at = self.get_next_update_due_at(self.created)
+
+        dirty = self.get_dirty_fields()
         super(Outage, self).save(*args, **kwargs)
+        publish_outage_changes(self, dirty)
 
-        history = OutageHistory.objects.create(
-            summary=self.summary,
-            sales_affected_choice=self.sales_affected_choice,
-            b2b_partners_affected_choice=self.b2b_partners_affected_choice,
-            sales_affected=self.sales_affected,
-            lost_bookings=self.lost_bookings,
-            lost_bookings_choice=self.lost_bookings_choice,
-            impact_on_turnover=self.impact_on_turnover,
-            communication_assignee=self.communication_assignee,
-            solution_assignee=self.solution_assignee,
-            created=self.created,
-            created_by=self.created_by,
-            eta=self.eta,
-            eta_last_modified=self.eta_last_modified,
-            outage=self,
-            change_desc=change_desc,
-            modified_by=modified_by,
-            started_at=self.started_at,
-            systems_affected=self.systems_affected,
-            resolved=self.resolved,
-        )
-        history.save()
+        if change_desc or has_history_changes(dirty, OutageHistory):
+            record_version(
+                self,
+                self.history_outage,
+                change_desc=change_desc,
+                modified_by=modified_by,
+            )
 
     class Meta:
         ordering = ["-pk"]
+        indexes = [
+            # Reminders look up only unresolved outages.
+            models.Index(
+                fields=["eta_deadline"],
+                name="core_outage_eta_deadline_idx",
+                condition=models.Q(resolved=False),
+            ),
+            models.Index(
+                fields=["next_update_due_at"],
+                name="core_outage_update_due_idx",
+                condition=models.Q(resolved=False),
+            ),
+        ]
 
 
 class OutageHistory(AbstractOutage):
+    """Outage version, see `phoenix.core.history` for delta encoding."""
+
+    HISTORY_FIELDS = (
+        "summary",
+        "systems_affected_id",
+        "communication_assignee_id",
+        "solution_assignee_id",
+        "created",
+        "created_by_id",
+        "started_at",
+        "announce_on_slack",
+        "sales_affected_choice",
+        "b2b_partners_affected_choice",
+        "sales_affected",
+        "lost_bookings",
+        "lost_bookings_choice",
+        "impact_on_turnover",
+        "eta",
+        "eta_last_modified",
+        "resolved",
+    )
+
     modified_by = models.ForeignKey(
         USER_MODEL, null=True, blank=True, on_delete=models.CASCADE
     )
@@ -315,9 +467,14 @@ class OutageHistory(AbstractOutage):
     )
     change_desc = models.TextField(null=True, blank=True, max_length=3000)
     timestamp = models.DateTimeField(auto_now_add=True)
+    checkpoint = models.BooleanField(default=True)
+    changed_fields = ArrayField(models.CharField(max_length=50), default=list)
     # name colisions
     created_by = models.ForeignKey(
-        USER_MODEL, related_name="history_outage_created", on_delete=models.CASCADE
+        USER_MODEL,
+        related_name="history_outage_created",
+        on_delete=models.CASCADE,
+        null=True,
     )
     resolved_by = models.ForeignKey(
         USER_MODEL,
@@ -327,21 +484,59 @@ class OutageHistory(AbstractOutage):
         blank=True,
     )
     communication_assignee = models.ForeignKey(
-        USER_MODEL, related_name="history_comunicate_outages", on_delete=models.CASCADE
+        USER_MODEL,
+        related_name="history_comunicate_outages",
+        on_delete=models.CASCADE,
+        null=True,
     )
     solution_assignee = models.ForeignKey(
-        USER_MODEL, related_name="history_solves_outages", on_delete=models.CASCADE
+        USER_MODEL,
+        related_name="history_solves_outages",
+        on_delete=models.CASCADE,
+        null=True,
+    )
+    # Fields unchanged in delta are NULL.
+    summary = models.TextField(null=True, blank=False, max_length=3000)
+    created = models.DateTimeField(null=True, default=timezone.now)
+    started_at = models.DateTimeField(null=True, default=timezone.now)
+    announce_on_slack = models.BooleanField(null=True, default=True)
+    sales_affected_choice = models.CharField(
+        choices=AbstractOutage.SALES_AFFECTED_CHOICES,
+        max_length=2,
+        null=True,
+        default=AbstractOutage.UNKNOWN,
+    )
+    b2b_partners_affected_choice = models.CharField(
+        choices=AbstractOutage.SALES_AFFECTED_CHOICES,
+        max_length=2,
+        null=True,
+        default=AbstractOutage.UNKNOWN,
+    )
+    lost_bookings_choice = models.CharField(
+        choices=AbstractOutage.LOST_BOOKINGS_CHOICES,
+        max_length=5,
+        null=True,
+        blank=False,
+    )
+    eta = models.CharField(
+        choices=AbstractOutage.ETA_CHOICES, max_length=6, null=True, blank=False
     )
+    resolved = models.BooleanField(null=True, default=False)
 
     def __str__(self):
-        return f"History Outage {self.id} for Outage {self.outage.id}"
+        return f"History Outage {self.id} for Outage {self.outage_id}"
 
     class Meta:
         ordering = ["-pk"]
+        indexes = [
+            models.Index(
+                fields=["outage", "timestamp", "id"],
+                name="core_outagehistory_as_of_idx",
+            )
+        ]
 
 
 class PostmortemNotifications(models.Model):
-    slack_notified = models.BooleanField(default=False)
     email_notified = models.BooleanField(default=False)
     label_notified = models.BooleanField(default=False)
 
@@ -381,7 +576,7 @@ class SolutionManager(models.Manager):
         return self.filter(suggested_outcome=AbstractSolution.POSTMORTEM)
 
 
-class Solution(AbstractSolution):
+class Solution(DirtyFieldsMixin, AbstractSolution):
     objects = SolutionManager()
 
     outage = models.OneToOneField(Outage, on_delete=models.CASCADE)
@@ -449,27 +644,39 @@ class Solution(AbstractSolution):
         return f"Solution {self.pk}"
 
     def save(self, *args, **kwargs):  # pylint: disable=arguments-differ
+        """Save changed fields, record history if tracked field changed.
+
+        Use `force_history` to record history without any change,
+        e.g. when outage is resolved again.
+        """
         modified_by = kwargs.pop("modified_by", None)
+        force_history = kwargs.pop("force_history", False)
         if self.summary:
             self.summary = self.summary.strip()
+        dirty = self.get_dirty_fields()
         super().save(*args, **kwargs)
+        publish_solution_changes(self, dirty)
 
-        SolutionHistory.objects.create(
-            solution=self,
-            modified_by=modified_by,
-            created_by=self.created_by,
-            summary=self.summary,
-            resolved_at=self.resolved_at,
-            solving_time=self.solving_time,
-            suggested_outcome=self.suggested_outcome,
-            report_url=self.report_url,
-        )
+        if force_history or has_history_changes(dirty, SolutionHistory):
+            record_version(self, self.solution_history, modified_by=modified_by)
 
     class Meta:
         ordering = ["-pk"]
 
 
 class SolutionHistory(AbstractSolution):
+    """Solution version, see `phoenix.core.history` for delta encoding."""
+
+    HISTORY_FIELDS = (
+        "created_by_id",
+        "summary",
+        "resolved_at",
+        "solving_time",
+        "suggested_outcome",
+        "report_url",
+        "report_title",
+    )
+
     modified_by = models.ForeignKey(
         USER_MODEL, on_delete=models.CASCADE, null=True, blank=True
     )
@@ -484,6 +691,17 @@ class SolutionHistory(AbstractSolution):
     solution = models.ForeignKey(
         Solution, related_name="solution_history", on_delete=models.CASCADE
     )
+    checkpoint = models.BooleanField(default=True)
+    changed_fields = ArrayField(models.CharField(max_length=50), default=list)
+    # Fields unchanged in delta are NULL.
+    resolved_at = models.DateTimeField(null=True, default=timezone.now)
+    solving_time = models.IntegerField(null=True, default=0)
+    suggested_outcome = models.CharField(
+        choices=AbstractSolution.OUTCOME_CHOICES,
+        default=AbstractSolution.NONE,
+        max_length=2,
+        null=True,
+    )
 
     class Meta:
         ordering = ["-pk"]
@@ -586,6 +804,20 @@ class Monitor(AbstractMonitor):
 
 
 class MonitorHistory(AbstractMonitor):
+    # Every row is a full snapshot, fields compared by history compaction.
+    HISTORY_FIELDS = (
+        "monitoring_system",
+        "external_id",
+        "created",
+        "link",
+        "severity",
+        "description",
+        "created_by",
+        "name",
+        "slack_channel_id",
+        "slack_channel_name",
+    )
+
     modified_by = models.ForeignKey(
         USER_MODEL, blank=True, null=True, on_delete=models.CASCADE
     )
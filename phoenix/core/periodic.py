@@ -0,0 +1,114 @@
+"""Run locks and run registry of periodic tasks.
+
+Task decorated with `single_run` holds lock in Redis while running, tick
+started while previous run is still in progress is skipped and counted.
+Every finished run is recorded with its duration and number of processed
+items, which is the value returned by the task if it's a number.
+"""
+from functools import wraps
+import json
+import logging
+import time
+import uuid
+
+from django.utils import timezone
+from redis import RedisError
+
+from .redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+LOCK_KEY = "phoenix:periodic:lock:{}"
+RUNS_KEY = "phoenix:periodic:runs:{}"
+SKIPPED_KEY = "phoenix:periodic:skipped"
+# Number of the latest runs kept in registry for every task.
+RUNS_KEPT = 100
+
+# Names of decorated tasks.
+TASKS = []
+
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def acquire(name, timeout):
+    """Return token of acquired lock or None if it's held by another run."""
+    token = uuid.uuid4().hex
+    if get_redis().set(LOCK_KEY.format(name), token, nx=True, ex=timeout):
+        return token
+    return None
+
+
+def release(name, token):
+    """Release lock, unless it expired and another run acquired it."""
+    get_redis().eval(RELEASE_SCRIPT, 1, LOCK_KEY.format(name), token)
+
+
+def record_run(name, started, duration, items, failed):
+    run = {
+        "started": started.isoformat(),
+        "duration": round(duration, 3),
+        "items": items,
+        "failed": failed,
+    }
+    logger.info(f"Periodic task {name} finished: {run}")
+    pipe = get_redis().pipeline()
+    pipe.lpush(RUNS_KEY.format(name), json.dumps(run))
+    pipe.ltrim(RUNS_KEY.format(name), 0, RUNS_KEPT - 1)
+    pipe.execute()
+
+
+def get_runs(name):
+    """Return recorded runs of task, from the latest."""
+    return [json.loads(run) for run in get_redis().lrange(RUNS_KEY.format(name), 0, -1)]
+
+
+def get_skipped():
+    """Return numbers of skipped ticks by task name."""
+    return {
+        name.decode(): int(count)
+        for name, count in get_redis().hgetall(SKIPPED_KEY).items()
+    }
+
+
+def single_run(timeout):
+    """Never run decorated task concurrently.
+
+    Lock expires after `timeout` seconds, so it's not held forever when
+    worker dies, `timeout` has to be longer than any run of the task.
+    """
+
+    def decorator(fun):
+        name = f"{fun.__module__}.{fun.__name__}"
+        TASKS.append(name)
+
+        @wraps(fun)
+        def wrapper(*args, **kwargs):
+            token = acquire(name, timeout)
+            if token is None:
+                get_redis().hincrby(SKIPPED_KEY, name)
+                logger.warning(f"Skipping {name}, previous run is still in progress")
+                return None
+            started, start = timezone.now(), time.monotonic()
+            result, failed = None, True
+            try:
+                result = fun(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                duration = time.monotonic() - start
+                # bool is int too, but it's not number of items
+                items = result if type(result) is int else None
+                try:
+                    release(name, token)
+                    record_run(name, started, duration, items, failed)
+                except RedisError as e:
+                    logger.warning(f"Recording run of {name} failed: {e}")
+
+        return wrapper
+
+    return decorator
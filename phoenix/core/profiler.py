@@ -0,0 +1,47 @@
+"""Sampling profiler of single thread.
+
+Background thread records call stack of the profiled thread every
+`interval` seconds. Profile is written in collapsed stack format, one
+stack per line with number of its samples, which flame graph tools read.
+"""
+from collections import Counter
+import sys
+import threading
+
+
+def get_stack(frame):
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_filename}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+class SamplingProfiler:
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(  # pylint: disable=protected-access
+                self.thread_id
+            )
+            if frame is not None:
+                self.samples[get_stack(frame)] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def write(self, path):
+        with open(path, "w") as profile:
+            for stack, count in self.samples.most_common():
+                profile.write(f"{stack} {count}\n")
@@ -0,0 +1,10 @@
+from functools import lru_cache
+
+from django.conf import settings
+import redis
+
+
+@lru_cache(maxsize=None)
+def get_redis():
+    """Return Redis client shared by the process, connections are pooled."""
+    return redis.Redis.from_url(settings.REDIS_URL)
@@ -0,0 +1,93 @@
+"""Celery task routing.
+
+Interactive announcement work, periodic reminders and bulk synchronizations
+are sent to separate queues, so slow syncs never delay announcement updates.
+Each queue can be consumed by dedicated workers with its own concurrency.
+
+Tasks working with single outage can be partitioned by outage ID into fixed
+set of queues (see `OUTAGE_TASK_PARTITIONS`). Every partition queue is meant
+to be consumed by one worker process, so tasks for the same outage are
+processed one by one in the order they were sent, while different outages
+are still processed in parallel. Tasks still lock the rows, web views
+and Slack handlers change the same outages outside of the queues.
+"""
+from django.conf import settings
+
+ANNOUNCEMENTS_QUEUE = "announcements"
+REMINDERS_QUEUE = "reminders"
+SYNC_QUEUE = "sync"
+OUTAGE_QUEUE_PREFIX = "outages."
+
+# Tasks not listed here are sent to default "celery" queue.
+TASK_QUEUES = {
+    "phoenix.slackbot.tasks.create_or_update_announcement": ANNOUNCEMENTS_QUEUE,
+    "phoenix.slackbot.tasks.create_channel": ANNOUNCEMENTS_QUEUE,
+    "phoenix.slackbot.tasks.share_message_to_announcement": ANNOUNCEMENTS_QUEUE,
+    "phoenix.slackbot.tasks.post_warning_to_user": ANNOUNCEMENTS_QUEUE,
+    "phoenix.slackbot.tasks.pin_message": ANNOUNCEMENTS_QUEUE,
+    "phoenix.slackbot.tasks.unpin_message": ANNOUNCEMENTS_QUEUE,
+    "phoenix.slackbot.tasks.add_comment": ANNOUNCEMENTS_QUEUE,
+    "phoenix.slackbot.tasks.notify_assigned": ANNOUNCEMENTS_QUEUE,
+    "phoenix.slackbot.tasks.dispatch_outbox": ANNOUNCEMENTS_QUEUE,
+    "phoenix.slackbot.tasks.notify_users": REMINDERS_QUEUE,
+    "phoenix.slackbot.tasks.notify_eta_deadline": REMINDERS_QUEUE,
+    "phoenix.slackbot.tasks.notify_missing_postmortem": REMINDERS_QUEUE,
+    "phoenix.slackbot.tasks.dispatch_timers": REMINDERS_QUEUE,
+    "phoenix.slackbot.tasks.sync_timers": REMINDERS_QUEUE,
+    "phoenix.slackbot.tasks.notify_communication_assignee": REMINDERS_QUEUE,
+    "phoenix.slackbot.tasks.postmortem_notifications": REMINDERS_QUEUE,
+    "phoenix.slackbot.tasks.notify_users_with_due_date_postmortems": REMINDERS_QUEUE,
+    "phoenix.slackbot.tasks.sync_users": SYNC_QUEUE,
+    "phoenix.slackbot.tasks.sync_user_groups_with_google": SYNC_QUEUE,
+    "phoenix.slackbot.tasks.join_datadog_channels": SYNC_QUEUE,
+    "phoenix.slackbot.tasks.sync_monitor_details_task": SYNC_QUEUE,
+    "phoenix.slackbot.tasks.generate_after_due_date_issues_report": SYNC_QUEUE,
+    "phoenix.slackbot.tasks.compact_history": SYNC_QUEUE,
+    "phoenix.slackbot.tasks.sync_postmortem_issues": SYNC_QUEUE,
+}
+
+# Task name -> (keyword, position) of the argument holding outage ID.
+OUTAGE_TASKS = {
+    "phoenix.slackbot.tasks.create_or_update_announcement": ("outage_pk", 0),
+    "phoenix.slackbot.tasks.create_channel": ("outage_id", 0),
+}
+
+
+def jump_consistent_hash(key, num_buckets):
+    """Return bucket for key in range(num_buckets).
+
+    Jump consistent hash (Lamping, Veach), changing number of buckets
+    moves only 1/n of keys to different bucket.
+    """
+    bucket, jump = -1, 0
+    while jump < num_buckets:
+        bucket = jump
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        jump = int((bucket + 1) * (float(1 << 31) / float((key >> 33) + 1)))
+    return bucket
+
+
+def get_outage_queue(outage_id):
+    partition = jump_consistent_hash(int(outage_id), settings.OUTAGE_TASK_PARTITIONS)
+    return f"{OUTAGE_QUEUE_PREFIX}{partition}"
+
+
+def get_outage_id(name, args, kwargs):
+    keyword, position = OUTAGE_TASKS[name]
+    if keyword in kwargs:
+        return kwargs[keyword]
+    if len(args) > position:
+        return args[position]
+    return None
+
+
+def route_task(name, args, kwargs, options, task=None, **kw):
+    """Celery router, see CELERY_TASK_ROUTES."""
+    if settings.OUTAGE_TASK_PARTITIONS and name in OUTAGE_TASKS:
+        outage_id = get_outage_id(name, args or (), kwargs or {})
+        if outage_id is not None:
+            return {"queue": get_outage_queue(outage_id)}
+    queue = TASK_QUEUES.get(name)
+    if queue:
+        return {"queue": queue}
+    return None
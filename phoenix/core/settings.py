@@ -3,6 +3,7 @@ import json
 import os
 import re
 
+from kombu import Queue
 from kw.structlog_config import (  # pylint: disable=no-name-in-module,import-error
     configure_stdlib_logging,  # Ignore PyImportSortBear
     configure_structlog,
@@ -165,6 +166,41 @@ if re.match(r"^\d+.\d+.\d+.\d+$", REDIS_URL):
 CELERY_BROKER_URL = REDIS_URL
 CELERY_BROKER_CONNECTION_MAX_RETRIES = 5
 CELERY_WORKER_HIJACK_ROOT_LOGGER = False
+CELERY_TASK_ROUTES = ("phoenix.core.routing.route_task",)
+# Workers started without "-Q" consume all of these queues.
+CELERY_TASK_QUEUES = tuple(
+    Queue(name, routing_key=name)
+    for name in ("celery", "announcements", "reminders", "sync")
+)
+# Log warning if announcement task waits in queue longer than this (seconds).
+ANNOUNCEMENTS_MAX_QUEUE_WAIT = float(os.getenv("ANNOUNCEMENTS_MAX_QUEUE_WAIT", "1"))
+
+# Route tasks working with single outage into this number of "outages.<n>"
+# queues by outage ID. Every such queue has to be consumed by single worker
+# process (--concurrency=1). Set to 0 to disable partitioning.
+OUTAGE_TASK_PARTITIONS = int(os.getenv("OUTAGE_TASK_PARTITIONS", "0"))
+CELERY_TASK_QUEUES += tuple(
+    Queue(f"outages.{n}", routing_key=f"outages.{n}")
+    for n in range(OUTAGE_TASK_PARTITIONS)
+)
+
+# Maximum number of delta history rows between two full checkpoints
+HISTORY_CHECKPOINT_INTERVAL = int(os.getenv("HISTORY_CHECKPOINT_INTERVAL", "20"))
+# History older than this is moved from database to gzipped JSONL files
+HISTORY_ARCHIVE_AFTER_DAYS = int(os.getenv("HISTORY_ARCHIVE_AFTER_DAYS", "365"))
+# Has to be persistent, history is not archived when it's not set.
+HISTORY_ARCHIVE_DIR = os.getenv("HISTORY_ARCHIVE_DIR")
+
+# Live updates stream of outage detail page is closed after this number
+# of seconds, browser reconnects immediately.
+OUTAGE_STREAM_MAX_DURATION = int(os.getenv("OUTAGE_STREAM_MAX_DURATION", "120"))
+# Same as in gunicorn config, streams hold web server threads.
+GUNICORN_THREADS = int(os.getenv("GUNICORN_THREADS", "8"))
+# Quarter of threads at most, the rest is left for other requests.
+OUTAGE_STREAMS_PER_WORKER = min(
+    int(os.getenv("OUTAGE_STREAMS_PER_WORKER", GUNICORN_THREADS // 4)),
+    GUNICORN_THREADS // 4,
+)
 
 SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
 
@@ -196,6 +232,25 @@ SLACK_NOTIFY_B2B_CHANNEL_ID = os.getenv("SLACK_NOTIFY_B2B_CHANNEL_ID")
 
 SLACK_POSTMORTEM_REPORT_CHANNEL = os.getenv("SLACK_POSTMORTEM_REPORT_CHANNEL")
 
+# Delivery of messages recorded in Slack outbox
+SLACK_OUTBOX_BATCH_SIZE = int(os.getenv("SLACK_OUTBOX_BATCH_SIZE", "100"))
+SLACK_OUTBOX_CHANNEL_BURST = int(os.getenv("SLACK_OUTBOX_CHANNEL_BURST", "5"))
+SLACK_OUTBOX_MAX_ATTEMPTS = int(os.getenv("SLACK_OUTBOX_MAX_ATTEMPTS", "5"))
+SLACK_OUTBOX_RETRY_DELAY = int(os.getenv("SLACK_OUTBOX_RETRY_DELAY", "2"))
+
+# Maximum number of due timers popped from Redis at once.
+TIMERS_BATCH_SIZE = int(os.getenv("TIMERS_BATCH_SIZE", "100"))
+
+# Celery task runs longer than this number of seconds are profiled,
+# profiling is disabled when not set.
+TASK_PROFILE_THRESHOLD = os.getenv("TASK_PROFILE_THRESHOLD")
+if TASK_PROFILE_THRESHOLD is not None:
+    TASK_PROFILE_THRESHOLD = float(TASK_PROFILE_THRESHOLD)
+TASK_PROFILE_INTERVAL = float(os.getenv("TASK_PROFILE_INTERVAL", "0.01"))
+# Fraction of task runs profiled, each of them runs sampling thread.
+TASK_PROFILE_SAMPLE_RATE = float(os.getenv("TASK_PROFILE_SAMPLE_RATE", "0.1"))
+TASK_PROFILE_DIR = os.getenv("TASK_PROFILE_DIR", os.path.join(BASE_DIR, "profiles"))
+
 NOTIFY_BEFORE_ETA = int(os.getenv("NOTIFY_BEFORE_ETA", "10"))
 
 # DATADOG
@@ -208,6 +263,8 @@ hostname = os.getenv("DATADOG_TAG_HOST", os.getenv("HOSTNAME"))
 if hostname:
     DATADOG_TRACE["TAGS"]["host"] = hostname
 
+DATADOG_STATSD_PORT = int(os.getenv("DATADOG_STATSD_PORT", "8125"))
+
 DATADOG_API_KEY = os.getenv("DATADOG_API_KEY")
 DATADOG_APP_KEY = os.getenv("DATADOG_APP_KEY")
 
@@ -226,6 +283,10 @@ GOOGLE_ACC = os.getenv("GOOGLE_ACC")
 GOOGLE_SERVICE_ACCOUNT = os.getenv("GOOGLE_SERVICE_ACCOUNT")
 if GOOGLE_SERVICE_ACCOUNT:
     GOOGLE_SERVICE_ACCOUNT = json.loads(GOOGLE_SERVICE_ACCOUNT)
+GOOGLE_DISCOVERY_DOCUMENT = os.getenv(
+    "GOOGLE_DISCOVERY_DOCUMENT",
+    os.path.join(BASE_DIR, "google_discovery", "directory_v1.json"),
+)
 
 # Specify all limits in hours for example: 48
 POSTMORTEM_NOTIFICATION_LIST_LIMIT = int(
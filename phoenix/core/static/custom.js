@@ -1,6 +1,74 @@
-function transform_timestamps(field_class) {
-    var elements = document.getElementsByClassName(field_class);
+function format_timestamp(value) {
+    return moment(value, 'X').format('HH:mm ddd, DD.MM.YYYY');
+}
+
+function transform_timestamps(field_class, root) {
+    var elements = (root || document).getElementsByClassName(field_class);
     for(element of elements) {
-        element.textContent = moment(element.textContent, 'X').format('HH:mm ddd, DD.MM.YYYY');
+        element.textContent = format_timestamp(element.textContent);
+    }
+}
+
+function load_older_notifications(button) {
+    $.get(button.dataset.url, function (html) {
+        var container = document.createElement('div');
+        container.innerHTML = html;
+        transform_timestamps('timestamp-transform', container);
+        $(button).replaceWith(container.childNodes);
+    });
+}
+
+function set_live_value(element, value) {
+    if (value !== null && typeof value === 'object') {
+        element.textContent = value.text;
+        element.href = value.href;
+    } else if (value && element.classList.contains('timestamp-transform')) {
+        element.textContent = format_timestamp(value);
+    } else {
+        element.textContent = value;
     }
 }
+
+function render_notification(notification) {
+    var item = $('<div class="notification">');
+    var text = $('<p class="notification-text">').text(notification.text + ' ');
+    if (notification.created_by) {
+        text.append($('<span class="notification-created-by">').text('by ' + notification.created_by));
+    }
+    item.append(text);
+    item.append($('<p class="notification-datetime">').text(format_timestamp(notification.created)));
+    return item;
+}
+
+function follow_outage(url) {
+    var source = new EventSource(url);
+    source.addEventListener('values', function (event) {
+        var values = JSON.parse(event.data);
+        for (var name in values) {
+            var elements = document.querySelectorAll('[data-live="' + name + '"]');
+            if (!elements.length) {
+                // Element is not rendered for the previous value.
+                location.reload();
+                return;
+            }
+            for (element of elements) {
+                set_live_value(element, values[name]);
+            }
+        }
+    });
+    source.addEventListener('notifications', function (event) {
+        for (notification of JSON.parse(event.data)) {
+            $('#notifications').prepend(render_notification(notification));
+        }
+    });
+    source.addEventListener('reload', function () {
+        location.reload();
+    });
+    source.addEventListener('busy', function (event) {
+        // Server has no free stream, refresh the page periodically instead.
+        source.close();
+        setTimeout(function () {
+            location.reload();
+        }, JSON.parse(event.data).refresh * 1000);
+    });
+}
@@ -0,0 +1,113 @@
+"""Celery signal handlers measuring queue wait and runtime of tasks.
+
+Both are logged and sent to DogStatsD as histograms tagged by task name.
+Runs longer than `TASK_PROFILE_THRESHOLD` are profiled when it is set,
+see `phoenix.core.profiler`. Only `TASK_PROFILE_SAMPLE_RATE` of runs are
+profiled, every one of them runs profiler thread.
+"""
+import logging
+import os
+import random
+import threading
+import time
+
+from celery.signals import (
+    before_task_publish,
+    task_postrun,
+    task_prerun,
+    task_revoked,
+)
+from datadog.dogstatsd import DogStatsd
+from django.conf import settings
+
+from .profiler import SamplingProfiler
+from .routing import ANNOUNCEMENTS_QUEUE
+
+logger = logging.getLogger(__name__)
+
+SENT_AT_HEADER = "phoenix_sent_at"
+
+statsd = DogStatsd(
+    host=settings.DATADOG_TRACE["AGENT_HOSTNAME"],
+    port=settings.DATADOG_STATSD_PORT,
+    constant_tags=[f"env:{settings.DATADOG_TRACE['TAGS']['env']}"],
+)
+
+# Task ID -> (start time, profiler or None) of tasks running in this process.
+running = {}
+
+
+@before_task_publish.connect
+def add_sent_at_header(sender=None, headers=None, **kwargs):
+    if headers is not None:
+        headers[SENT_AT_HEADER] = time.time()
+
+
+def get_queue_wait(task):
+    sent_at = getattr(task.request, SENT_AT_HEADER, None)
+    if sent_at is None:
+        return None
+    return time.time() - sent_at
+
+
+@task_prerun.connect
+def log_queue_wait(sender=None, task=None, **kwargs):
+    wait = get_queue_wait(task)
+    if wait is None:
+        return
+    queue = (task.request.delivery_info or {}).get("routing_key")
+    logger.info(f"Task {task.name} waited {wait:.3f}s in queue {queue}")
+    statsd.histogram(
+        "phoenix.task.queue_wait", wait, tags=[f"task:{task.name}", f"queue:{queue}"]
+    )
+    if queue == ANNOUNCEMENTS_QUEUE and wait > settings.ANNOUNCEMENTS_MAX_QUEUE_WAIT:
+        logger.warning(
+            f"Task {task.name} waited {wait:.3f}s in queue {queue}, "
+            f"limit is {settings.ANNOUNCEMENTS_MAX_QUEUE_WAIT}s"
+        )
+
+
+def should_profile():
+    return (
+        settings.TASK_PROFILE_THRESHOLD is not None
+        and random.random() < settings.TASK_PROFILE_SAMPLE_RATE
+    )
+
+
+@task_prerun.connect
+def start_run(sender=None, task_id=None, task=None, **kwargs):
+    profiler = None
+    if should_profile():
+        profiler = SamplingProfiler(
+            threading.get_ident(), settings.TASK_PROFILE_INTERVAL
+        )
+        profiler.start()
+    running[task_id] = time.monotonic(), profiler
+
+
+@task_revoked.connect
+def cancel_run(sender=None, request=None, **kwargs):
+    """Forget run of task terminated before `task_postrun` was sent."""
+    _, profiler = running.pop(getattr(request, "id", None), (None, None))
+    if profiler is not None:
+        profiler.stop()
+
+
+@task_postrun.connect
+def finish_run(sender=None, task_id=None, task=None, state=None, **kwargs):
+    started, profiler = running.pop(task_id, (None, None))
+    if started is None:
+        return
+    runtime = time.monotonic() - started
+    logger.info(f"Task {task.name} finished in {runtime:.3f}s, state {state}")
+    statsd.histogram(
+        "phoenix.task.runtime", runtime, tags=[f"task:{task.name}", f"state:{state}"]
+    )
+    if profiler is None:
+        return
+    profiler.stop()
+    if runtime >= settings.TASK_PROFILE_THRESHOLD:
+        os.makedirs(settings.TASK_PROFILE_DIR, exist_ok=True)
+        path = os.path.join(settings.TASK_PROFILE_DIR, f"{task.name}-{task_id}.txt")
+        profiler.write(path)
+        logger.warning(f"Task {task.name} ran {runtime:.3f}s, profile saved to {path}")
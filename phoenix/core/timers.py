@@ -0,0 +1,94 @@
+"""Timers stored in Redis sorted set.
+
+Domain code registers timer with `schedule` under key naming what is due,
+e.g. `eta-reminder:<outage ID>`. Scheduling the same key again moves the
+timer and `cancel` removes it. Timer payload is name and arguments of
+Celery task sent when the timer fires.
+
+`dispatch` pops due timers in batches by Lua script, so every timer fires
+once even when dispatchers run concurrently.
+"""
+from functools import lru_cache
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from redis import RedisError
+
+from .redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+TIMERS_KEY = "phoenix:timers"
+PAYLOADS_KEY = "phoenix:timers:payloads"
+
+POP_DUE_SCRIPT = """
+local keys = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+if #keys == 0 then
+    return {}
+end
+local payloads = redis.call('HMGET', KEYS[2], unpack(keys))
+redis.call('ZREM', KEYS[1], unpack(keys))
+redis.call('HDEL', KEYS[2], unpack(keys))
+return payloads
+"""
+
+
+@lru_cache(maxsize=None)
+def get_pop_due_script():
+    return get_redis().register_script(POP_DUE_SCRIPT)
+
+
+def schedule(key, due, task, *args, replace=True, not_before=None):
+    """Fire `task` with `args` at `due` datetime, not before `not_before`.
+
+    Existing timer is moved, unless `replace` is False. Redis errors are
+    only logged, lost timers are restored by `sync_timers` task.
+    """
+    if not_before is not None:
+        due = max(due, not_before)
+    payload = json.dumps({"task": task, "args": args}, cls=DjangoJSONEncoder)
+    pipe = get_redis().pipeline()
+    if replace:
+        pipe.hset(PAYLOADS_KEY, key, payload)
+    else:
+        pipe.hsetnx(PAYLOADS_KEY, key, payload)
+    pipe.zadd(TIMERS_KEY, {key: due.timestamp()}, nx=not replace)
+    try:
+        pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Scheduling timer {key} failed: {e}")
+
+
+def cancel(*keys):
+    pipe = get_redis().pipeline()
+    pipe.zrem(TIMERS_KEY, *keys)
+    pipe.hdel(PAYLOADS_KEY, *keys)
+    try:
+        pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Cancelling timers {keys} failed: {e}")
+
+
+def pop_due(limit):
+    """Remove and return payloads of up to `limit` due timers."""
+    payloads = get_pop_due_script()(
+        keys=[TIMERS_KEY, PAYLOADS_KEY], args=[time.time(), limit]
+    )
+    return [json.loads(payload) for payload in payloads if payload]
+
+
+def dispatch():
+    """Send tasks of all due timers, return number of fired timers."""
+    from .celery import app
+
+    fired = 0
+    while True:
+        payloads = pop_due(settings.TIMERS_BATCH_SIZE)
+        for payload in payloads:
+            app.send_task(payload["task"], args=payload["args"])
+        fired += len(payloads)
+        if len(payloads) < settings.TIMERS_BATCH_SIZE:
+            return fired
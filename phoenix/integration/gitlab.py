@@ -1,39 +1,125 @@
 import datetime
+from functools import lru_cache
 import logging
 import re
 from urllib.parse import urlparse
 
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
 import gitlab
 
+from .models import PostmortemIssue
+
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=None)
+def get_client(url, private_token):
+    """Return client shared by the process, its session reuses connections."""
+    return gitlab.Gitlab(url, private_token=private_token)
+
+
 def get_api():
     if settings.GITLAB_URL and settings.GITLAB_PRIVATE_TOKEN:
-        return gitlab.Gitlab(
-            settings.GITLAB_URL, private_token=settings.GITLAB_PRIVATE_TOKEN
-        )
+        return get_client(settings.GITLAB_URL, settings.GITLAB_PRIVATE_TOKEN)
 
     logger.warning("Skipping gitlab features...")
     return None
 
 
+def get_project(api, project_path):
+    """Return project handle without fetching the project.
+
+    Missing project fails on the first request using the handle.
+    """
+    return api.projects.get(project_path, lazy=True)
+
+
 def postmortem_project():
     api = get_api()
     if not api:
         return
-    project = api.projects.get(settings.GITLAB_POSTMORTEM_PROJECT)
-    if not project:
-        logger.error("Postmortem project not found.")
-    return project
+    return get_project(api, settings.GITLAB_POSTMORTEM_PROJECT)
+
+
+def to_postmortem_issue(issue):
+    return PostmortemIssue(
+        id=issue.id,
+        iid=issue.iid,
+        title=issue.title,
+        description=issue.description or "",
+        web_url=issue.web_url,
+        state=issue.state,
+        labels=issue.labels,
+        due_date=issue.due_date,
+        author_username=issue.author["username"],
+        assignees=[
+            {"id": assignee["id"], "username": assignee["username"]}
+            for assignee in issue.assignees
+        ],
+        updated_at=issue.updated_at,
+    )
 
 
-def get_open_postmortems():
+def close_deleted_issues(project):
+    """Close stored opened issues which are not opened in GitLab anymore.
+
+    Deleted issues are never returned as updated, so they are found
+    by listing all opened issues. Return number of closed issues.
+    """
+    opened = [
+        issue.id
+        for issue in project.issues.list(all=True, state=PostmortemIssue.OPENED)
+    ]
+    return (
+        PostmortemIssue.objects.filter(state=PostmortemIssue.OPENED)
+        .exclude(id__in=opened)
+        .update(state=PostmortemIssue.CLOSED)
+    )
+
+
+def sync_postmortem_issues(full=False):
+    """Store issues of postmortem project changed since the last sync.
+
+    The first sync stores only opened issues, later ones fetch issues
+    of all states updated after the latest stored change, so closed
+    issues are updated too. `full` sync also closes issues deleted
+    in GitLab. Return number of stored and closed issues.
+    """
     project = postmortem_project()
-    return project.issues.list(
-        all=True, state="opened", **{"not": {"labels": "non-outage"}}
+    if not project:
+        return 0
+    last_updated = PostmortemIssue.objects.aggregate(last=Max("updated_at"))["last"]
+    if last_updated is None:
+        filters = {"state": PostmortemIssue.OPENED}
+    else:
+        filters = {"updated_after": last_updated.isoformat()}
+    issues = [
+        to_postmortem_issue(issue)
+        for issue in project.issues.list(all=True, order_by="updated_at", **filters)
+    ]
+    existing = set(
+        PostmortemIssue.objects.filter(
+            id__in=[issue.id for issue in issues]
+        ).values_list("id", flat=True)
     )
+    fields = [
+        field.name for field in PostmortemIssue._meta.fields if field.name != "id"
+    ]
+    with transaction.atomic():
+        PostmortemIssue.objects.bulk_create(
+            [issue for issue in issues if issue.id not in existing], batch_size=500
+        )
+        PostmortemIssue.objects.bulk_update(
+            [issue for issue in issues if issue.id in existing], fields, batch_size=500
+        )
+    logger.info(f"Synchronized {len(issues)} postmortem issues")
+    closed = 0
+    if full:
+        closed = close_deleted_issues(project)
+        logger.info(f"Closed {closed} postmortem issues deleted in GitLab")
+    return len(issues) + closed
 
 
 def parse_report_url(report_url):
@@ -50,26 +136,13 @@ def parse_report_url(report_url):
     return project_path, groups["issue_id"]
 
 
-def get_postmortem_project(api, project_path):
-    """Parse project name from URL and get gitlab project."""
-    project = api.projects.get(project_path)
-    if not project:
-        logger.error(f"Unable to retrieve gitlab project: {project_path}")
-        return
-    return project
-
-
 def get_postmortem_title(report_url):
     """Get title of postmortem (gitlab issue)."""
     project_path, issue_id = parse_report_url(report_url)
     api = get_api()
     if not all((api, project_path, issue_id)):
         return
-    project = get_postmortem_project(api, project_path)
-    if not project:
-        return
-
-    issue = project.issues.get(issue_id)
+    issue = get_project(api, project_path).issues.get(issue_id)
     if not issue:
         logger.error(f"Issue #{issue_id} not found in postmortem project.")
     return issue.title
@@ -79,7 +152,7 @@ def get_issue(project_slug, issue_id):
     api = get_api()
     if not api:
         return None
-    return api.projects.get(project_slug).issues.get(issue_id)
+    return get_project(api, project_slug).issues.get(issue_id)
 
 
 def get_due_date_issues(days=None):
@@ -88,42 +161,26 @@ def get_due_date_issues(days=None):
         days = list(map(int, days.split(",")))
     else:
         days = settings.GITLAB_POSTMORTEM_DAYS_TO_NOTIFY
-    days = sorted(days, reverse=True)
 
-    opened_issues = get_open_postmortems()
-
-    notify = {}
-    now = datetime.date.today()
-
-    for open_issue in opened_issues:
-        if not open_issue.due_date:
-            continue
-        due_date = datetime.date.fromisoformat(open_issue.due_date)
-        days_remaining = (due_date - now).days
-        for day in days:
-            if days_remaining == day:
-                notify[open_issue.id] = open_issue
-    return notify
+    today = datetime.date.today()
+    due_dates = [today + datetime.timedelta(days=day) for day in days]
+    issues = PostmortemIssue.objects.opened().filter(due_date__in=due_dates)
+    return {issue.id: issue for issue in issues}
 
 
 def get_issues_after_due_date():
-    opened_issues = get_open_postmortems()
-    now = datetime.date.today()
-    after_due_date = []
-    for issue in opened_issues:
-        if not issue.due_date:
-            continue
-        due_date = datetime.date.fromisoformat(issue.due_date)
-        if due_date < now:
-            after_due_date.append(issue)
-    return after_due_date
+    return list(
+        PostmortemIssue.objects.opened()
+        .filter(due_date__lt=datetime.date.today())
+        .order_by("due_date", "iid")
+    )
 
 
 def get_gitlab_user_email(uid):
     api = get_api()
     if not api:
         return
-    user = api.users.get(uid)
+    user = api.users.get(uid, lazy=True)
     try:
         emails = user.emails.list()
     except gitlab.exceptions.GitlabListError as e:
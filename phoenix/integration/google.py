@@ -1,16 +1,94 @@
+"""Google Directory API client.
+
+Discovery document of the API is stored on disk after the first download
+and credentials are shared by the whole process, so their access token is
+refreshed only when it expires.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import logging
+import os
+import threading
+
 from django.conf import settings
 from google.oauth2 import service_account  # pylint: disable=no-name-in-module
 import googleapiclient.discovery
+import requests
+
+logger = logging.getLogger(__name__)
 
 SCOPES = ["https://www.googleapis.com/auth/admin.directory.group.member.readonly"]
+DISCOVERY_URL = "https://www.googleapis.com/discovery/v1/apis/admin/directory_v1/rest"
 
+# Number of groups fetched concurrently.
+MAX_WORKERS = 8
 
-def get_directory_api():
+# HTTP client of Directory API is not thread-safe, clients are per thread.
+clients = threading.local()
+
+
+@lru_cache(maxsize=None)
+def get_credentials():
     credentials = service_account.Credentials.from_service_account_info(
         settings.GOOGLE_SERVICE_ACCOUNT, scopes=SCOPES
     )
     if settings.GOOGLE_ACC:
         credentials = credentials.with_subject(settings.GOOGLE_ACC)
-    return googleapiclient.discovery.build(
-        "admin", "directory_v1", credentials=credentials
-    )
+    return credentials
+
+
+@lru_cache(maxsize=None)
+def get_discovery_document():
+    """Return discovery document from disk, download it if it's missing."""
+    path = settings.GOOGLE_DISCOVERY_DOCUMENT
+    try:
+        with open(path) as document_file:
+            return document_file.read()
+    except FileNotFoundError:
+        pass
+    logger.info(f"Downloading discovery document of Directory API to {path}")
+    response = requests.get(DISCOVERY_URL, timeout=30)
+    response.raise_for_status()
+    document = response.text
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Concurrent readers never see incomplete file.
+    temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}"
+    with open(temporary_path, "w") as document_file:
+        document_file.write(document)
+    os.replace(temporary_path, path)
+    return document
+
+
+def get_directory_api():
+    """Return Directory API client of the current thread."""
+    if not hasattr(clients, "directory_api"):
+        clients.directory_api = googleapiclient.discovery.build_from_document(
+            get_discovery_document(), credentials=get_credentials()
+        )
+    return clients.directory_api
+
+
+def get_group_member_emails(directory_api, group_key):
+    """Return emails of all members of group, fetching every page."""
+    emails = set()
+    page_token = None
+    while True:
+        response = (
+            directory_api.members()
+            .list(groupKey=group_key, pageToken=page_token)
+            .execute()
+        )
+        emails.update(member["email"] for member in response.get("members", []))
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            return emails
+
+
+def get_groups_member_emails(group_keys):
+    """Return emails of members of any of groups, groups are fetched concurrently."""
+
+    def fetch(group_key):
+        return get_group_member_emails(get_directory_api(), group_key)
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        return set().union(*executor.map(fetch, group_keys))
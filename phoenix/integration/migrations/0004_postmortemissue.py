@@ -0,0 +1,62 @@
+# Generated by Django 3.0.2 on 2026-10-19 10:37
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.fields.jsonb
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("integration", "0003_auto_20181204_1136"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PostmortemIssue",
+            fields=[
+                ("id", models.IntegerField(primary_key=True, serialize=False)),
+                ("iid", models.IntegerField()),
+                ("title", models.TextField()),
+                ("description", models.TextField(blank=True, default="")),
+                ("web_url", models.TextField()),
+                ("state", models.CharField(max_length=20)),
+                (
+                    "labels",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.CharField(max_length=255),
+                        default=list,
+                        size=None,
+                    ),
+                ),
+                ("due_date", models.DateField(blank=True, null=True)),
+                ("author_username", models.CharField(max_length=255)),
+                (
+                    "assignees",
+                    django.contrib.postgres.fields.jsonb.JSONField(default=list),
+                ),
+                ("updated_at", models.DateTimeField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="postmortemissue",
+            index=models.Index(
+                condition=models.Q(state="opened"),
+                fields=["due_date"],
+                name="integration_pm_due_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="postmortemissue",
+            index=models.Index(
+                fields=["updated_at"], name="integration_pm_updated_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="postmortemissue",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["labels"], name="integration_pm_labels_idx"
+            ),
+        ),
+    ]
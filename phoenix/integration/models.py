@@ -1,3 +1,5 @@
+from django.contrib.postgres.fields import ArrayField, JSONField
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 
 
@@ -8,3 +10,50 @@ class GoogleGroup(models.Model):
 
     def __str__(self):
         return f"GoogleGroup({self.id}) - {self.name}"
+
+
+class PostmortemIssueManager(models.Manager):
+    def opened(self):
+        return self.filter(state=PostmortemIssue.OPENED).exclude(
+            labels__contains=[PostmortemIssue.NON_OUTAGE_LABEL]
+        )
+
+
+class PostmortemIssue(models.Model):
+    """Issue of postmortem project, see `phoenix.integration.gitlab`.
+
+    Primary key is GitLab ID of the issue.
+    """
+
+    OPENED = "opened"
+    CLOSED = "closed"
+    NON_OUTAGE_LABEL = "non-outage"
+
+    objects = PostmortemIssueManager()
+
+    id = models.IntegerField(primary_key=True)
+    iid = models.IntegerField()
+    title = models.TextField()
+    description = models.TextField(default="", blank=True)
+    web_url = models.TextField()
+    state = models.CharField(max_length=20)
+    labels = ArrayField(models.CharField(max_length=255), default=list)
+    due_date = models.DateField(null=True, blank=True)
+    author_username = models.CharField(max_length=255)
+    # Objects with `id` and `username` keys as returned by GitLab.
+    assignees = JSONField(default=list)
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["due_date"],
+                name="integration_pm_due_date_idx",
+                condition=models.Q(state="opened"),
+            ),
+            models.Index(fields=["updated_at"], name="integration_pm_updated_idx"),
+            GinIndex(fields=["labels"], name="integration_pm_labels_idx"),
+        ]
+
+    def __str__(self):
+        return f"Postmortem issue #{self.iid}"
@@ -63,12 +63,15 @@ class SolutionCreateForm(ModelForm):
     def save(self, commit=True):
         m = super().save(commit=False)
 
+        # Reopened outage is resolved again by saving its existing solution.
+        reopened = m.pk is not None and not m.outage.resolved
         # Set outage.resolved for proper resolution
         m.outage.resolved = True
 
         if commit:
-            m.save(modified_by=self.modified_by)
+            # Outage first, solution version then announces the resolution.
             m.outage.save(modified_by=self.modified_by)
+            m.save(modified_by=self.modified_by, force_history=reopened)
         return m
 
 
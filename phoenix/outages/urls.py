@@ -8,10 +8,13 @@ from .views import (
     MonitorUpdateView,
     OutageCreate,
     OutageDetail,
+    OutageHistoryView,
     OutagesList,
     OutageUpdate,
     SolutionCreate,
     SolutionUpdate,
+    outage_notifications,
+    outage_stream,
     reopen_outage,
 )
 
@@ -27,6 +30,9 @@ urlpatterns = [
     path("monitors", MonitorList.as_view(), name="monitors_list"),
     path("create", create_view, name="outage_create"),
     path("<int:pk>", OutageDetail.as_view(), name="outage_detail"),
+    path("<int:pk>/history", OutageHistoryView.as_view(), name="outage_history"),
+    path("<int:pk>/notifications", outage_notifications, name="outage_notifications",),
+    path("<int:pk>/stream", outage_stream, name="outage_stream"),
     path("monitors/<int:pk>", MonitorDetail.as_view(), name="monitor_detail"),
     path("<int:pk>/update", OutageUpdate.as_view(), name="outage_update"),
     path(
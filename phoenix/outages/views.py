@@ -1,14 +1,21 @@
 from datetime import datetime
 
 import arrow
-from django.http import Http404, HttpResponseForbidden, HttpResponseBadRequest
+from django.http import (
+    Http404,
+    HttpResponseBadRequest,
+    HttpResponseForbidden,
+    StreamingHttpResponse,
+)
 from django.urls import reverse
 from django.utils import timezone
 from django.views.generic import CreateView, DetailView, ListView, UpdateView
-from django.shortcuts import redirect
+from django.shortcuts import get_object_or_404, redirect, render
 from rest_framework.decorators import api_view
 
-from ..core.models import Monitor, Outage, Solution
+from ..core import live
+from ..core.archive import get_versions
+from ..core.models import Monitor, Notification, Outage, Solution
 from ..core.utils import user_can_modify_outage
 from ..slackbot.utils import resolved_at_to_utc
 from .forms import MonitorUpdate, OutageCreateForm, OutageUpdateForm, SolutionCreateForm
@@ -50,15 +57,79 @@ class OutageCreate(CreateView):
         return form_class(**kwargs)
 
 
+NOTIFICATIONS_PAGE_SIZE = 50
+
+
+def get_notifications_page(outage_id, before=None):
+    """Return notifications older than `before` and cursor of the next page."""
+    notifications = (
+        Notification.objects.filter(outage_id=outage_id)
+        .select_related("created_by")
+        .order_by("-pk")
+    )
+    if before:
+        notifications = notifications.filter(pk__lt=before)
+    page = list(notifications[: NOTIFICATIONS_PAGE_SIZE + 1])
+    if len(page) > NOTIFICATIONS_PAGE_SIZE:
+        return page[:NOTIFICATIONS_PAGE_SIZE], page[NOTIFICATIONS_PAGE_SIZE - 1].pk
+    return page, None
+
+
 class OutageDetail(DetailView):
     model = Outage
     template_name = "outages/outage_detail.html"
+    queryset = Outage.objects.select_related(
+        "systems_affected",
+        "created_by__profile",
+        "solution_assignee__profile",
+        "communication_assignee__profile",
+        "solution__created_by__profile",
+    )
 
     def get_context_data(self, **kwargs):  # pylint: disable=arguments-differ
         context = super().get_context_data(**kwargs)
         context["user_can_modify"] = user_can_modify_outage(
             self.request.user.id, self.kwargs["pk"], True
         )
+        context["notifications"], context["next_cursor"] = get_notifications_page(
+            self.object.pk
+        )
+        return context
+
+
+def outage_notifications(request, pk):
+    """Render page of older notifications for outage detail timeline."""
+    try:
+        before = int(request.GET["before"])
+    except (KeyError, ValueError):
+        return HttpResponseBadRequest("Missing or invalid cursor.")
+    notifications, next_cursor = get_notifications_page(pk, before)
+    return render(
+        request,
+        "outages/notifications.html",
+        {"outage_id": pk, "notifications": notifications, "next_cursor": next_cursor},
+    )
+
+
+def outage_stream(request, pk):
+    """Stream changes of outage to its detail page as server-sent events."""
+    get_object_or_404(Outage.objects.only("pk"), pk=pk)
+    response = StreamingHttpResponse(live.stream(pk), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Disable response buffering in nginx.
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+class OutageHistoryView(DetailView):
+    model = Outage
+    template_name = "outages/outage_history.html"
+
+    def get_context_data(self, **kwargs):  # pylint: disable=arguments-differ
+        context = super().get_context_data(**kwargs)
+        archived = "archived" in self.request.GET
+        context["archived"] = archived
+        context["versions"] = get_versions("outage", self.object.pk, archived=archived)
         return context
 
 
@@ -14,26 +14,32 @@ class SlackbotConfig(AppConfig):
 
         from .tasks import (
             join_datadog_channels,
-            notify_users,
             sync_user_groups_with_google,
-            notify_communication_assignee,
             notify_users_with_due_date_postmortems,
             generate_after_due_date_issues_report,
-            postmortem_notifications,
+            dispatch_outbox,
+            dispatch_timers,
+            sync_timers,
+            compact_history,
+            sync_postmortem_issues,
         )
 
-        celery_app.add_periodic_task(timedelta(minutes=20), notify_users)
+        celery_app.add_periodic_task(timedelta(seconds=10), dispatch_timers)
+        celery_app.add_periodic_task(timedelta(hours=1), sync_timers)
         celery_app.add_periodic_task(timedelta(hours=8), sync_user_groups_with_google)
         celery_app.add_periodic_task(timedelta(hours=24), join_datadog_channels)
+        celery_app.add_periodic_task(timedelta(minutes=15), sync_postmortem_issues)
+        # Deleted issues are found only by full sync.
         celery_app.add_periodic_task(
-            timedelta(hours=24), notify_users_with_due_date_postmortems
+            timedelta(hours=24), sync_postmortem_issues.s(full=True)
         )
-        celery_app.add_periodic_task(timedelta(hours=1), postmortem_notifications)
         celery_app.add_periodic_task(
-            timedelta(minutes=1), notify_communication_assignee
+            timedelta(hours=24), notify_users_with_due_date_postmortems
         )
+        celery_app.add_periodic_task(timedelta(minutes=1), dispatch_outbox)
 
         celery_app.add_periodic_task(
             crontab(day_of_week=1, hour=1, minute=0),
             generate_after_due_date_issues_report,
         )
+        celery_app.add_periodic_task(crontab(hour=3, minute=0), compact_history)
@@ -7,6 +7,24 @@ from ..core.utils import execution_time_logger
 
 logger = logging.getLogger(__name__)
 
+# Errors after which it makes sense to repeat the same API call later.
+RETRYABLE_ERRORS = (
+    "ratelimited",
+    "internal_error",
+    "fatal_error",
+    "service_unavailable",
+    "request_timeout",
+)
+
+
+class SlackApiError(Exception):
+    """Slack API call failed with error worth retrying."""
+
+
+def raise_for_retryable_error(resp):
+    if not resp["ok"] and resp.get("error") in RETRYABLE_ERRORS:
+        raise SlackApiError(resp["error"])
+
 
 class PhoenixSlackClient:
     def __init__(self, token):
@@ -0,0 +1,103 @@
+"""Field-level changes between two latest history versions.
+
+History is loaded once per comment generation and all compared fields
+are diffed in one pass, comment generators only look up the result.
+"""
+from dataclasses import dataclass
+from operator import attrgetter, ne
+from typing import Any
+
+from ..core.history import latest_versions as history_versions
+
+
+@dataclass(frozen=True)
+class FieldChange:
+    field: str
+    previous: Any
+    current: Any
+
+
+class ChangeSet:
+    """Ordered collection of field changes."""
+
+    def __init__(self, changes=()):
+        self._changes = {change.field: change for change in changes}
+
+    def __contains__(self, name):
+        return name in self._changes
+
+    def __getitem__(self, name):
+        return self._changes[name]
+
+    def __iter__(self):
+        return iter(self._changes.values())
+
+    def __len__(self):
+        return len(self._changes)
+
+    def __add__(self, other):
+        return ChangeSet([*self, *other])
+
+    def select(self, fields):
+        """Return changes of given fields in the order of `fields`."""
+        return ChangeSet([self[name] for name in fields if name in self])
+
+
+def minutes_differ(previous, current):
+    """Times set in Slack dialogs are rounded to minutes, ignore small shifts."""
+    return abs(current.minute - previous.minute) >= 2
+
+
+def field(name, *attrs, differ=ne):
+    """Describe compared field, value is read from `attrs` (default `name`)."""
+    return name, attrgetter(*(attrs or (name,))), differ
+
+
+# Assignees are compared by IDs, so users are not loaded for comparison.
+OUTAGE_FIELDS = (
+    field("eta"),
+    field("assignees", "solution_assignee_id", "communication_assignee_id"),
+    field("sales_affected_choice"),
+    field("b2b_partners_affected_choice"),
+    field("lost_bookings_choice"),
+    field("lost_bookings"),
+)
+
+SOLUTION_FIELDS = (
+    field("summary"),
+    field("suggested_outcome"),
+    field("report_url"),
+    field("resolved_at", differ=minutes_differ),
+)
+
+# Outage fields reported together with solution changes.
+RESOLVED_OUTAGE_FIELDS = (
+    field("sales_affected_choice"),
+    field("b2b_partners_affected_choice"),
+    field("sales_affected"),
+    field("started_at", differ=minutes_differ),
+    field("resolved"),
+)
+
+
+def latest_versions(history, *related):
+    """Return up to two latest versions from history queryset.
+
+    Users needed for comments are loaded by the same query.
+    """
+    return history_versions(
+        history.select_related("modified_by__profile", "created_by", *related)
+    )
+
+
+def diff(versions, fields):
+    """Return changes between versions ordered from the latest."""
+    if len(versions) < 2:
+        return ChangeSet()
+    current, previous = versions
+    changes = []
+    for name, value, differ in fields:
+        current_value, previous_value = value(current), value(previous)
+        if differ(previous_value, current_value):
+            changes.append(FieldChange(name, previous_value, current_value))
+    return ChangeSet(changes)
@@ -0,0 +1,21 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from ...tasks import sync_postmortem_issues
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Stores postmortem issues changed in Gitlab since the previous sync"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Also close stored issues deleted in Gitlab",
+        )
+
+    def handle(self, *args, **options):
+        sync_postmortem_issues(full=options["full"])
@@ -0,0 +1,14 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from ...tasks import sync_timers
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Registers reminder timers missing in Redis, e.g. after deployment"
+
+    def handle(self, *args, **options):
+        sync_timers()
@@ -19,4 +19,7 @@ class Command(BaseCommand):
     """
 
     def handle(self, *args, **options):
-        sync_users()
+        stats = sync_users()
+        self.stdout.write(
+            ", ".join(f"{count} {result}" for result, count in stats.items())
+        )
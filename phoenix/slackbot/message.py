@@ -1,7 +1,5 @@
-from django.urls import reverse
-
-from . import utils
 from ..core.models import Solution
+from .snapshot import OutageSnapshot
 
 SLACK_FIELDS = {
     "sales": {"title": "Impact on sales"},
@@ -73,9 +71,8 @@ def slack_field(field_name, value=None):
 
 
 class BaseMessage:
-    def __init__(self, outage, announcement):
-        self.outage = outage
-        self.announcement = announcement
+    def __init__(self, snapshot):
+        self.outage = snapshot
         self.title = f"{self.outage.systems_affected_human} incident"
 
     def generate_message(self):
@@ -84,14 +81,12 @@ class BaseMessage:
         return [attachment]
 
     def generate_base(self):
-        outage_rel_link = reverse("outage_detail", kwargs={"pk": self.outage.pk})
-        outage_abs_link = utils.get_absolute_url(outage_rel_link)
         attachment = {
             "callback_id": self.outage.id,
             "fallback": f"{self.title} - {self.outage.summary}",
             "color": self.color,
             "title": self.title,
-            "title_link": outage_abs_link,
+            "title_link": self.outage.link,
             "attachment_type": "default",
             "text": self.outage.summary,
             "fields": [],
@@ -103,17 +98,15 @@ class BaseMessage:
 
     def get_formatted_assigneess(self):
         """Return assignees formated for slack."""
-        solution_assignee = utils.format_user_for_slack(self.outage.solution_assignee)
-        communication_assignee = utils.format_user_for_slack(
-            self.outage.communication_assignee
-        )
+        solution_assignee = self.outage.solution_assignee
+        communication_assignee = self.outage.communication_assignee
         return f"{solution_assignee} for resolution\n{communication_assignee} for communication"
 
 
 class SolutionMessage(BaseMessage):
-    def __init__(self, outage, announcement):
-        super().__init__(outage, announcement)
-        self.solution = outage.is_resolved
+    def __init__(self, snapshot):
+        super().__init__(snapshot)
+        self.solution = snapshot.solution
         self.title = (
             self.solution.report_title
             if self.solution.report_title
@@ -134,7 +127,7 @@ class SolutionMessage(BaseMessage):
         return resolution
 
     def get_formatted_duration(self):
-        days, hours, minutes, _ = self.solution.duration()
+        days, hours, minutes, _ = self.solution.duration
         duration = f"{minutes}m"
         if hours:
             duration = f"{hours}h " + duration
@@ -170,10 +163,9 @@ class SolutionMessage(BaseMessage):
         return attachment
 
     def add_footer(self, attachment):
-        resolver = utils.format_user_for_slack(self.solution.created_by)
-        footer_msg = f"Outage was resolved by {resolver}"
+        footer_msg = f"Outage was resolved by {self.solution.resolved_by}"
         attachment["footer"] = footer_msg
-        attachment["ts"] = self.solution.resolved_at.timestamp()
+        attachment["ts"] = self.solution.resolved_at
         attachment["footer_icon"] = (
             "https://slack-imgs.com/?c=1&o1=wi32.he32.si&url=https%3A%2F%2Fs3-us-west-2"
             ".amazonaws.com%2Fpd-slack%2Ficons%2Fresolved.png"
@@ -188,14 +180,14 @@ class SolutionMessage(BaseMessage):
 
 
 class OutageMessage(BaseMessage):
-    def __init__(self, outage, announcement):
-        super().__init__(outage, announcement)
+    def __init__(self, snapshot):
+        super().__init__(snapshot)
         self.color = "danger"
 
     def get_formatted_sales(self):
         """Return sales affected formatted for slack."""
         msg = f"{self.outage.sales_affected_choice_human.capitalize()}."
-        msg += f" {self.outage.lost_bookings_human()}"
+        msg += f" {self.outage.lost_bookings_human}"
         return msg
 
     def add_fields(self, attachment):
@@ -214,7 +206,7 @@ class OutageMessage(BaseMessage):
             SLACK_ACTIONS["edit"],
             SLACK_ACTIONS["edit_assignees"],
         ]
-        if not self.announcement.dedicated_channel_id:
+        if not self.outage.dedicated_channel_id:
             attachment["actions"] += [
                 SLACK_ACTIONS["create_channel"],
                 SLACK_ACTIONS["assign_channel"],
@@ -227,7 +219,12 @@ class OutageMessage(BaseMessage):
         return attachment
 
 
+def render_slack_message(snapshot):
+    """Return announcement attachments for given outage snapshot."""
+    if snapshot.is_resolved:
+        return SolutionMessage(snapshot).generate_message()
+    return OutageMessage(snapshot).generate_message()
+
+
 def generate_slack_message(outage, announcement):
-    if outage.is_resolved:
-        return SolutionMessage(outage, announcement).generate_message()
-    return OutageMessage(outage, announcement).generate_message()
+    return render_slack_message(OutageSnapshot.from_outage(outage, announcement))
@@ -0,0 +1,93 @@
+# Generated by Django 3.0.2 on 2026-10-19 10:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def init_outbox(apps, schema_editor):
+    """Record already sent notifications, so they are never sent again."""
+    Announcement = apps.get_model("slackbot", "Announcement")
+    Solution = apps.get_model("core", "Solution")
+    SlackOutboxMessage = apps.get_model("slackbot", "SlackOutboxMessage")
+    messages = []
+    for announcement in Announcement.objects.filter(sales_notified=True):
+        messages.append(
+            SlackOutboxMessage(
+                dedup_key=f"outage:{announcement.outage_id}:sales-created",
+                channel_id=settings.SLACK_NOTIFY_SALES_CHANNEL_ID or "",
+                text="",
+                sent_at=announcement.date,
+            )
+        )
+    for announcement in Announcement.objects.filter(b2b_notified=True):
+        messages.append(
+            SlackOutboxMessage(
+                dedup_key=f"outage:{announcement.outage_id}:b2b-created",
+                channel_id=settings.SLACK_NOTIFY_B2B_CHANNEL_ID or "",
+                text="",
+                sent_at=announcement.date,
+            )
+        )
+    solutions = Solution.objects.filter(
+        postmortem_notifications__slack_notified=True
+    ).select_related("created_by")
+    for solution in solutions:
+        # `created_by` is nullable, such reminders are recorded without channel.
+        creator = solution.created_by
+        messages.append(
+            SlackOutboxMessage(
+                dedup_key=f"solution:{solution.id}:postmortem-reminder",
+                channel_id=creator.last_name if creator else "",
+                direct=True,
+                text="",
+                sent_at=solution.created,
+            )
+        )
+    SlackOutboxMessage.objects.bulk_create(messages, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0034_auto_20191223_0946"),
+        ("slackbot", "0003_announcement_b2b_notified"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SlackOutboxMessage",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("dedup_key", models.CharField(max_length=200, unique=True)),
+                ("channel_id", models.CharField(max_length=100)),
+                ("direct", models.BooleanField(default=False)),
+                ("text", models.TextField()),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                ("sent_at", models.DateTimeField(blank=True, null=True)),
+                ("attempts", models.PositiveSmallIntegerField(default=0)),
+                (
+                    "last_error",
+                    models.CharField(blank=True, max_length=100, null=True),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="slackoutboxmessage",
+            index=models.Index(
+                condition=models.Q(sent_at__isnull=True),
+                fields=["created"],
+                name="slackbot_outbox_pending_idx",
+            ),
+        ),
+        migrations.RunPython(init_outbox, migrations.RunPython.noop),
+        migrations.RemoveField(model_name="announcement", name="b2b_notified"),
+        migrations.RemoveField(model_name="announcement", name="sales_notified"),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 3.0.2 on 2026-10-19 10:35
+
+import re
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Users synchronized from Slack have their Slack ID in last name.
+SLACK_ID_RE = re.compile(r"^[UW][A-Z0-9]{6,}$")
+
+
+def fill_slack_members(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split("."))
+    SlackMember = apps.get_model("slackbot", "SlackMember")
+    members = {}
+    for user_id, last_name in User.objects.order_by("id").values_list(
+        "id", "last_name"
+    ):
+        if SLACK_ID_RE.match(last_name or ""):
+            members.setdefault(last_name, user_id)
+    SlackMember.objects.bulk_create(
+        [
+            SlackMember(slack_id=slack_id, user_id=user_id)
+            for slack_id, user_id in members.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("slackbot", "0004_slackoutboxmessage"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SlackMember",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("slack_id", models.CharField(max_length=50, unique=True)),
+                ("updated", models.DateTimeField(auto_now=True)),
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="slack_member",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.RunPython(fill_slack_members, migrations.RunPython.noop),
+    ]
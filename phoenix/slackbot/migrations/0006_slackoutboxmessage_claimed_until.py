@@ -0,0 +1,18 @@
+# Generated by Django 3.0.2 on 2026-10-19 10:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("slackbot", "0005_slackmember"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="slackoutboxmessage",
+            name="claimed_until",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.0.2 on 2026-10-19 15:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("slackbot", "0006_slackoutboxmessage_claimed_until"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="slackoutboxmessage",
+            name="ts",
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+    ]
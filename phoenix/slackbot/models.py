@@ -1,5 +1,6 @@
 import logging
 
+from django.conf import settings
 from django.db import models
 
 from ..core.models import Outage
@@ -16,8 +17,6 @@ class Announcement(models.Model):
     dedicated_channel_id = models.CharField(null=True, blank=True, max_length=100)
     permalink = models.CharField(null=True, blank=True, max_length=200)
     date = models.DateTimeField(auto_now_add=True)
-    sales_notified = models.BooleanField(default=False, null=True, blank=True)
-    b2b_notified = models.BooleanField(default=False, null=True, blank=True)
 
     def __init__(self, *args, **kwargs):
         super(Announcement, self).__init__(*args, **kwargs)
@@ -53,3 +52,47 @@ class Announcement(models.Model):
             create_channel.delay(self.outage.id, self.dedicated_channel_name)
         else:
             logger.warning(f"Channel for {self} already created.")
+
+
+class SlackOutboxMessage(models.Model):
+    """Slack message waiting for delivery, see `phoenix.slackbot.outbox`."""
+
+    dedup_key = models.CharField(max_length=200, unique=True)
+    channel_id = models.CharField(max_length=100)
+    direct = models.BooleanField(default=False)
+    text = models.TextField()
+    created = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    # Timestamp of posted Slack message, it identifies the message.
+    ts = models.CharField(null=True, blank=True, max_length=50)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.CharField(null=True, blank=True, max_length=100)
+    claimed_until = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["created"],
+                name="slackbot_outbox_pending_idx",
+                condition=models.Q(sent_at__isnull=True),
+            )
+        ]
+
+    def __str__(self):
+        return f"Slack message {self.dedup_key}"
+
+
+class SlackMember(models.Model):
+    """Slack identity of user, kept current by Slack events and `sync_users`.
+
+    Every lookup of user by Slack ID goes through this table.
+    """
+
+    slack_id = models.CharField(max_length=50, unique=True)
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="slack_member"
+    )
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Slack member {self.slack_id}"
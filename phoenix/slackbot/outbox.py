@@ -0,0 +1,159 @@
+"""Transactional outbox for Slack messages.
+
+Domain code records messages with `enqueue` in the same transaction as
+the model change they belong to. `dispatch` delivers pending messages in
+batches after the transaction is committed. Every message has unique
+`dedup_key`, so recording the same message again is a no-op.
+
+Messages are claimed for `CLAIM_TIMEOUT` seconds in short transaction and
+posted outside of it, so no row lock or transaction is held during Slack
+requests. Dispatcher may die after posting a message and before marking
+it as sent. When its claim expires, the channel history is searched for
+the message first and it's posted again only if it's not found there.
+"""
+from collections import OrderedDict
+from datetime import timedelta
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from requests import RequestException
+
+from .bot import RETRYABLE_ERRORS, slack_bot_client, slack_client
+from .models import SlackOutboxMessage
+
+logger = logging.getLogger(__name__)
+
+# Claimed messages are not picked by other dispatchers for this many seconds.
+CLAIM_TIMEOUT = 300
+# Number of latest channel messages searched for message of expired claim.
+HISTORY_LIMIT = 100
+
+
+def enqueue(dedup_key, channel_id, text, direct=False):
+    """Record message for `channel_id`, or user ID when `direct` is set."""
+    if SlackOutboxMessage.objects.filter(dedup_key=dedup_key).exists():
+        return
+    SlackOutboxMessage.objects.bulk_create(
+        [
+            SlackOutboxMessage(
+                dedup_key=dedup_key, channel_id=channel_id, direct=direct, text=text
+            )
+        ],
+        ignore_conflicts=True,
+    )
+    transaction.on_commit(schedule_dispatch)
+
+
+def schedule_dispatch(countdown=None):
+    from .tasks import dispatch_outbox
+
+    dispatch_outbox.apply_async(countdown=countdown)
+
+
+def find_posted(client, channel_id, message):
+    """Return `ts` of message found in channel history, None if not found."""
+    resp = client.api_call(
+        "conversations.history",
+        channel=channel_id,
+        oldest=message.created.timestamp(),
+        limit=HISTORY_LIMIT,
+    )
+    if not resp["ok"]:
+        logger.warning(f"Checking history of {message} failed: {resp['error']}")
+        return None
+    for posted in resp["messages"]:
+        if posted.get("text") == message.text:
+            return posted["ts"]
+    return None
+
+
+def post(message):
+    if not message.direct:
+        client, channel_id, options = slack_client, message.channel_id, {}
+    else:
+        client, options = slack_bot_client, {"as_user": False}
+        resp = client.api_call("im.open", user=message.channel_id)
+        if not resp["ok"]:
+            return resp
+        channel_id = resp["channel"]["id"]
+    if message.claimed_until is not None:
+        # Claim of dispatcher which died expired, it may have posted it.
+        ts = find_posted(client, channel_id, message)
+        if ts is not None:
+            return {"ok": True, "ts": ts}
+    return client.api_call(
+        "chat.postMessage", channel=channel_id, text=message.text, **options
+    )
+
+
+def group_by_channel(messages):
+    channels = OrderedDict()
+    for message in messages:
+        channels.setdefault(message.channel_id, []).append(message)
+    return channels
+
+
+def claim():
+    """Claim batch of pending messages for this dispatcher.
+
+    Rows are locked with SKIP LOCKED only while the claim is written, so
+    concurrent dispatchers never pick the same message.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        messages = list(
+            SlackOutboxMessage.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(claimed_until__isnull=True) | Q(claimed_until__lt=now),
+                sent_at__isnull=True,
+                attempts__lt=settings.SLACK_OUTBOX_MAX_ATTEMPTS,
+            )
+            .order_by("created")[: settings.SLACK_OUTBOX_BATCH_SIZE]
+        )
+        SlackOutboxMessage.objects.filter(pk__in=[m.pk for m in messages]).update(
+            claimed_until=now + timedelta(seconds=CLAIM_TIMEOUT)
+        )
+    return messages
+
+
+def dispatch():
+    """Deliver batch of pending messages, return number of delivered ones.
+
+    At most `SLACK_OUTBOX_CHANNEL_BURST` messages are posted to one channel
+    per run and channel is skipped for the rest of the run once Slack rate
+    limits it. Rate limited message is retried without using an attempt.
+    """
+    delivered = 0
+    postponed = False
+    messages = claim()
+    for channel_messages in group_by_channel(messages).values():
+        postponed |= len(channel_messages) > settings.SLACK_OUTBOX_CHANNEL_BURST
+        for message in channel_messages[: settings.SLACK_OUTBOX_CHANNEL_BURST]:
+            try:
+                resp = post(message)
+            except RequestException as e:
+                resp = {"ok": False, "error": "request_timeout"}
+                logger.warning(f"Posting {message} failed: {e}")
+            if resp["ok"]:
+                message.sent_at = timezone.now()
+                message.ts = resp.get("ts")
+                delivered += 1
+                continue
+            logger.error(f"Posting {message} failed: {resp['error']}")
+            message.last_error = resp["error"]
+            if resp["error"] != "ratelimited":
+                message.attempts += 1
+            if resp["error"] in RETRYABLE_ERRORS:
+                postponed = True
+                break
+    for message in messages:
+        message.claimed_until = None
+    SlackOutboxMessage.objects.bulk_update(
+        messages, ["sent_at", "ts", "attempts", "last_error", "claimed_until"]
+    )
+    if postponed or len(messages) == settings.SLACK_OUTBOX_BATCH_SIZE:
+        schedule_dispatch(countdown=settings.SLACK_OUTBOX_RETRY_DELAY)
+    return delivered
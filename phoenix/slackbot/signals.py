@@ -1,28 +1,88 @@
 from django.conf import settings
+from django.db import transaction
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
-from phoenix.core.models import Monitor, Outage, Solution
+from phoenix.core import timers
+from phoenix.core.models import (
+    Monitor,
+    Outage,
+    OutageHistory,
+    Solution,
+    SolutionHistory,
+)
 
 from .models import Announcement
-from .tasks import create_or_update_announcement, sync_monitor_details_task
+from .tasks import (
+    create_or_update_announcement,
+    schedule_eta_reminder,
+    schedule_postmortem_reminder,
+    schedule_update_request,
+    sync_monitor_details_task,
+)
 
 
 @receiver(post_save, sender=Outage)
-def outage_changed(sender, instance, created, **kwargs):
+def outage_created(sender, instance, created, **kwargs):
     if created:
         Announcement(
             outage=instance, channel_id=settings.SLACK_ANNOUNCE_CHANNEL_ID
         ).save()
-    check_history = not instance.resolved  # check history only if not resolved incident
+
+
+@receiver(post_save, sender=Outage)
+def outage_timers_changed(sender, instance, created, update_fields, **kwargs):
+    """Move reminders of outage when its deadlines change."""
+    changed = set(update_fields or ())
+    if instance.resolved:
+        if "resolved" in changed:
+            transaction.on_commit(
+                lambda: timers.cancel(
+                    f"eta-reminder:{instance.pk}", f"update-request:{instance.pk}"
+                )
+            )
+        return
+    opened = created or "resolved" in changed
+    eta_deadline = instance.eta_deadline
+    if eta_deadline and (opened or "eta_deadline" in changed):
+        transaction.on_commit(lambda: schedule_eta_reminder(instance.pk, eta_deadline))
+    next_update_due_at = instance.next_update_due_at
+    if next_update_due_at and opened:
+        transaction.on_commit(
+            lambda: schedule_update_request(instance.pk, next_update_due_at)
+        )
+
+
+@receiver(post_save, sender=Solution)
+def solution_outcome_changed(sender, instance, created, update_fields, **kwargs):
+    """Schedule postmortem reminder when postmortem is required."""
+    if not instance.postmortem_required:
+        return
+    if created or "suggested_outcome" in (update_fields or ()):
+        transaction.on_commit(
+            lambda: schedule_postmortem_reminder(instance.pk, instance.created)
+        )
+
+
+@receiver(post_save, sender=OutageHistory)
+def outage_changed(sender, instance, created, **kwargs):
+    """Update announcement when new outage version is recorded."""
+    if not created:
+        return
+    check_history = (
+        not instance.outage.resolved
+    )  # check history only if not resolved incident
     create_or_update_announcement.delay(
-        outage_pk=instance.pk, check_history=check_history
+        outage_pk=instance.outage_id, check_history=check_history
     )
 
 
-@receiver(post_save, sender=Solution)
+@receiver(post_save, sender=SolutionHistory)
 def solution_changed(sender, instance, created, **kwargs):
-    pk = instance.outage.pk
+    """Update announcement when new solution version is recorded."""
+    if not created:
+        return
+    pk = instance.solution.outage_id
     create_or_update_announcement.delay(outage_pk=pk, check_history=True)
 
 
@@ -0,0 +1,110 @@
+"""Immutable outage snapshots used for rendering Slack messages.
+
+Snapshot is built from one query (see `load_outage`) and message renderers
+read only from it, so rendering itself never touches the database.
+"""
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from django.urls import reverse
+
+from . import utils
+from ..core.models import Outage
+
+# Relations needed for rendering announcement, loaded together with outage.
+SNAPSHOT_RELATED = (
+    "systems_affected",
+    "communication_assignee",
+    "solution_assignee",
+    "solution",
+    "solution__created_by",
+    "announcement",
+)
+
+
+@dataclass(frozen=True)
+class SolutionSnapshot:
+    summary: Optional[str]
+    suggested_outcome: str
+    report_url: Optional[str]
+    full_report_url: Optional[str]
+    report_title: Optional[str]
+    duration: Tuple[int, int, int, int]
+    resolved_by: str
+    resolved_at: float
+
+    @classmethod
+    def from_solution(cls, solution):
+        return cls(
+            summary=solution.summary,
+            suggested_outcome=solution.suggested_outcome,
+            report_url=solution.report_url,
+            full_report_url=solution.full_report_url,
+            report_title=solution.report_title,
+            duration=solution.duration(),
+            resolved_by=utils.format_user_for_slack(solution.created_by),
+            resolved_at=solution.resolved_at.timestamp(),
+        )
+
+
+@dataclass(frozen=True)
+class OutageSnapshot:
+    id: int
+    summary: str
+    link: str
+    systems_affected_human: str
+    sales_affected_choice_human: str
+    sales_affected: Optional[str]
+    lost_bookings_human: str
+    eta: str
+    solution_assignee: str
+    communication_assignee: str
+    dedicated_channel_id: Optional[str]
+    solution: Optional[SolutionSnapshot]
+
+    @property
+    def is_resolved(self):
+        return self.solution is not None
+
+    @classmethod
+    def from_outage(cls, outage, announcement):
+        """Create snapshot from outage with preloaded relations.
+
+        Use `load_outage` to retrieve outage, otherwise every relation
+        is fetched with separate query.
+        """
+        solution = outage.is_resolved
+        outage_rel_link = reverse("outage_detail", kwargs={"pk": outage.pk})
+        return cls(
+            id=outage.id,
+            summary=outage.summary,
+            link=utils.get_absolute_url(outage_rel_link),
+            systems_affected_human=outage.systems_affected_human,
+            sales_affected_choice_human=outage.sales_affected_choice_human,
+            sales_affected=outage.sales_affected,
+            lost_bookings_human=outage.lost_bookings_human(),
+            eta=outage.eta,
+            solution_assignee=utils.format_user_for_slack(outage.solution_assignee),
+            communication_assignee=utils.format_user_for_slack(
+                outage.communication_assignee
+            ),
+            dedicated_channel_id=announcement.dedicated_channel_id,
+            solution=SolutionSnapshot.from_solution(solution) if solution else None,
+        )
+
+
+def load_outage(outage_pk, queryset=None):
+    """Retrieve outage together with all relations needed for rendering."""
+    if queryset is None:
+        queryset = Outage.objects.all()
+    return queryset.select_related(*SNAPSHOT_RELATED).get(pk=outage_pk)
+
+
+def load_outage_snapshot(outage_pk):
+    """Return snapshot of outage using single database round-trip.
+
+    Current `Site` used for absolute links is cached by Django after
+    the first lookup.
+    """
+    outage = load_outage(outage_pk)
+    return OutageSnapshot.from_outage(outage, outage.announcement)
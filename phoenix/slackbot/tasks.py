@@ -1,17 +1,23 @@
 import csv
+from dataclasses import asdict
+from datetime import timedelta
 from email.message import EmailMessage
 import logging
 import tempfile
-import time
 
 import arrow
-from celery import shared_task
+from celery import group, shared_task
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
-from django.db import DatabaseError, IntegrityError, transaction
-
-from ..core.models import Monitor, Outage, Profile, Solution
+from django.db import DatabaseError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from requests import RequestException
+
+from ..core import timers
+from ..core.periodic import single_run
+from ..core.models import Monitor, Outage, Solution
 from ..integration.datadog import get_all_slack_channels, sync_monitor_details
 from ..integration.gitlab import (  # Ignore PyImportSortBear
     get_due_date_issues,
@@ -20,21 +26,47 @@ from ..integration.gitlab import (  # Ignore PyImportSortBear
     get_issues_after_due_date,
     parse_action_list,
 )
-from ..integration.google import get_directory_api
+from ..integration.google import get_groups_member_emails
 from ..integration.models import GoogleGroup
 from ..outages.utils import format_datetime as format_outage_datetime
-from .bot import slack_bot_client, slack_client
-from .message import generate_slack_message
+from .bot import (
+    SlackApiError,
+    raise_for_retryable_error,
+    slack_bot_client,
+    slack_client,
+)
+from .changes import (
+    OUTAGE_FIELDS,
+    RESOLVED_OUTAGE_FIELDS,
+    SOLUTION_FIELDS,
+    diff,
+    latest_versions,
+)
+from .message import render_slack_message
+from .snapshot import OutageSnapshot, load_outage
 from .utils import (
     format_datetime,
     format_user_for_slack,
     join_channels,
     retrieve_user,
-    transfrom_slack_email_domain,
 )
 
 logger = logging.getLogger(__name__)
 
+# Users are reminded again after ETA deadline in this interval.
+ETA_REMINDER_INTERVAL = timedelta(minutes=20)
+# Update request which could not be sent is retried after this delay.
+UPDATE_REQUEST_RETRY_DELAY = timedelta(minutes=5)
+# Due timers restored by `sync_timers` fire after this delay.
+TIMER_RESYNC_DELAY = timedelta(minutes=10)
+
+# Options for tasks executing single Slack side effect, e.g. a notification.
+SIDE_EFFECT_TASK_OPTIONS = {
+    "autoretry_for": (SlackApiError, RequestException),
+    "retry_backoff": True,
+    "max_retries": 3,
+}
+
 
 @shared_task
 def share_message_to_announcement(
@@ -98,10 +130,17 @@ def create_channel(outage_id, channel_name=None, channel_id=None, invite_users=N
         return channel_id
 
 
-def notify_user_with_im(user, message=None, attachments=None):
+def notify_user_with_im(user, message=None, attachments=None, raise_retryable=False):
+    """Send direct message to user.
+
+    If raise_retryable is set, SlackApiError is raised for errors
+    worth retrying.
+    """
     data = slack_bot_client.api_call("im.open", user=user)
     if not data["ok"]:
         logger.error(f"Opening direct message channel failed: {data}")
+        if raise_retryable:
+            raise_for_retryable_error(data)
         return
     channel_id = data["channel"]["id"]
     data = slack_bot_client.api_call(
@@ -113,13 +152,16 @@ def notify_user_with_im(user, message=None, attachments=None):
     )
     if not data["ok"]:
         logger.error(f"Posting direct message failed: {data['error']}")
+        if raise_retryable:
+            raise_for_retryable_error(data)
         return False
     return data
 
 
+@shared_task(**SIDE_EFFECT_TASK_OPTIONS)
 def notify_assigned(user, outage_link, assignee_type="Solution"):
     message = f"You became {assignee_type} assignee on Outage {outage_link}"
-    notify_user_with_im(user, message)
+    notify_user_with_im(user, message, raise_retryable=True)
 
 
 def notify_unassigned(user, outage_link, assignee_type="Solution"):
@@ -127,9 +169,15 @@ def notify_unassigned(user, outage_link, assignee_type="Solution"):
     notify_user_with_im(user, message)
 
 
+def get_text_block(text):
+    return {"type": "section", "text": {"type": "mrkdwn", "text": text}}
+
+
 class CommentBase:
-    def __init__(self, outage, history):
+    def __init__(self, outage, history, changes):
         self.outage = outage
+        self.changes = changes
+        self.more_info = None
         self.slack_comments = []
         self.html_comments = []
         self.is_change = len(history) == 2
@@ -145,18 +193,44 @@ class CommentBase:
     def compose_comments(self):
         return "\n".join(self.slack_comments), " ".join(self.html_comments)
 
-    def post_comments(self, slack_comment, html_comment, icon_url=None, username=None):
+    def get_message_options(self, slack_comment):
+        """Return blocks and identity of thread message.
+
+        Message consisting only of more info is posted as its author,
+        otherwise more info is attributed to its author in context block
+        of the bot message.
+        """
+        if not slack_comment:
+            return {
+                "blocks": [get_text_block(self.more_info)],
+                "icon_url": self.modified_by.profile.image_48_url,
+                "username": self.modified_by.profile.slack_username,
+            }
+        blocks = [get_text_block(slack_comment)]
+        if self.more_info:
+            author = format_user_for_slack(self.modified_by)
+            more_info = {"type": "mrkdwn", "text": f"{author}: {self.more_info}"}
+            blocks.insert(0, {"type": "context", "elements": [more_info]})
+        return {"blocks": blocks}
+
+    def post_comments(self):
+        """Post more info and field changes as single thread message."""
+        slack_comment, html_comment = self.compose_comments()
+        texts = [text for text in (self.more_info, slack_comment) if text]
+        if not texts:
+            return
         if self.outage.announce_on_slack:
             resp = add_comment(
                 self.outage.announcement.message_ts,
                 self.outage.announcement.channel_id,
-                slack_comment,
-                icon_url=icon_url,
-                username=username,
+                "\n".join(texts),
+                **self.get_message_options(slack_comment),
             )
             if not resp["ok"]:
                 logger.error(f"Posting comment on slack failed: {resp}")
-        self.outage.add_notification(html_comment, self.modified_by)
+        self.outage.add_notifications(
+            [text for text in (self.more_info, html_comment) if text], self.modified_by
+        )
 
     def add_modified_by(self):
         self.slack_comments.append(f"by {format_user_for_slack(self.modified_by)}")
@@ -166,48 +240,31 @@ class CommentBase:
         if any(self.slack_comments):
             # Always add "modified by" at the end if any comment was added
             self.add_modified_by()
-        slack_comment, html_comment = self.compose_comments()
-        self.post_comments(slack_comment, html_comment)
+        self.post_comments()
+        self.more_info = None
         self.slack_comments = []
         self.html_comments = []
 
-    def field_changed(self, field):
-        # Check if custom method checking wether field values has changed exists.
-        # This method serves as override for generic checking if that is not usable for
-        # specific field.
-        # If you want to create this custom method use format "_{field_name}_changed".
-        field_changed_custom_method = getattr(self, f"_{field}_changed", None)
-        if field_changed_custom_method:
-            changed = field_changed_custom_method()
-        else:
-            current = getattr(self.current_version, field)
-            previous = getattr(self.previous_version, field)
-            changed = current != previous
-        return changed
-
-    def generate_generic_comment(self, field):
-        current = getattr(self.current_version, field)
-        field_label = " ".join([f.title() for f in field.split("_")])
-        comment = f"{field_label} changed to: {current}."
+    def generate_generic_comment(self, change):
+        field_label = " ".join([f.title() for f in change.field.split("_")])
+        comment = f"{field_label} changed to: {change.current}."
         self.slack_comments.append(comment)
         self.html_comments.append(comment)
 
-    def generate_comment(self, field):
+    def generate_comment(self, change):
         # Check if custom method for adding comment exists. This method serves
         # as override for generic comment addition, using this method you can specify
         # format of the comment message.
         # If you want to create this method use format "_add_{field_name}_comment"
-        custom_add_comment_method = getattr(self, f"_add_{field}_comment", None)
+        custom_add_comment_method = getattr(self, f"_add_{change.field}_comment", None)
         if custom_add_comment_method:
-            custom_add_comment_method()
+            custom_add_comment_method(change)
         else:
-            self.generate_generic_comment(field)
+            self.generate_generic_comment(change)
 
-    def add_comments(self, fields):
-        for field in fields:
-            changed = self.field_changed(field)
-            if changed:
-                self.generate_comment(field)
+    def add_comments(self, changes):
+        for change in changes:
+            self.generate_comment(change)
 
 
 class OutageComment(CommentBase):
@@ -228,17 +285,10 @@ class OutageComment(CommentBase):
             "lost_bookings_choice",
             "lost_bookings",
         ]
-        self.add_comments(fields)
+        self.add_comments(self.changes.select(fields))
 
     def process_more_info(self):
-        more_info = self.current_version.change_desc
-        if more_info:
-            self.post_comments(
-                more_info,
-                more_info,
-                icon_url=self.modified_by.profile.image_48_url,
-                username=self.modified_by.profile.slack_username,
-            )
+        self.more_info = self.current_version.change_desc
 
     def reopened(self):
         return hasattr(self.outage, "solution") and not self.outage.resolved
@@ -248,46 +298,36 @@ class OutageComment(CommentBase):
         self.slack_comments.append(comment)
         self.html_comments.append(comment)
 
-    def _add_eta_comment(self):
+    def _add_eta_comment(self, change):
         comment = f"ETA changed to {self.outage.eta}."
         self.slack_comments.append(comment)
         self.html_comments.append(comment)
 
-    def _assignees_changed(self):
-        """Check if curent and previous assignees differ.
-
-        Notify them in DM.
-        """
-        outage_link = self.current_version.outage.announcement.permalink
-        is_solution_same = (
-            self.current_version.solution_assignee.id
-            == self.previous_version.solution_assignee.id
-        )
-        if not is_solution_same:
+    def _notify_assignees(self, change):
+        """Notify changed assignees in DM."""
+        outage_link = self.outage.announcement.permalink
+        solution_id, communication_id = change.previous
+        if solution_id != self.current_version.solution_assignee_id:
             notify_unassigned(
                 self.previous_version.solution_assignee.last_name, outage_link
             )
-            notify_assigned(
+            notify_assigned.delay(
                 self.current_version.solution_assignee.last_name, outage_link
             )
-        is_communication_same = (
-            self.current_version.communication_assignee.id
-            == self.previous_version.communication_assignee.id
-        )
-        if not is_communication_same:
+        if communication_id != self.current_version.communication_assignee_id:
             notify_unassigned(
                 self.previous_version.communication_assignee.last_name,
                 outage_link,
                 assignee_type="Communication",
             )
-            notify_assigned(
+            notify_assigned.delay(
                 self.current_version.communication_assignee.last_name,
                 outage_link,
                 assignee_type="Communication",
             )
-        return not all((is_solution_same, is_communication_same))
 
-    def _add_assignees_comment(self):
+    def _add_assignees_comment(self, change):
+        self._notify_assignees(change)
         comment = " Solution assignee is {solution_assignee}."
         comment += " Communication assignee is {communication_assignee}."
 
@@ -306,19 +346,19 @@ class OutageComment(CommentBase):
             )
         )
 
-    def _add_sales_affected_choice_comment(self):
+    def _add_sales_affected_choice_comment(self, change):
         value = self.current_version.sales_affected_choice_human
         comment = f"Sales affected changed to: {value}."
         self.slack_comments.append(comment)
         self.html_comments.append(comment)
 
-    def _add_b2b_partners_affected_choice_comment(self):
-        value = self.current_version.b2b_partners_affected_choice_human
+    def _add_b2b_partners_affected_choice_comment(self, change):
+        value = self.current_version.b2b_partner_affected_choice_human
         comment = f"B2B Partners affected changed to: {value}."
         self.slack_comments.append(comment)
         self.html_comments.append(comment)
 
-    def _add_sales_affected_comment(self):
+    def _add_sales_affected_comment(self, change):
         value = self.current_version.sales_affected
         comment = f"Sales affected details changed to: {value}."
         self.slack_comments.append(comment)
@@ -344,94 +384,54 @@ class SolutionComment(CommentBase):
             "started_at",
             "resolved_at",
         ]
-        self.add_comments(fields)
+        self.add_comments(self.changes.select(fields))
 
     def has_been_resolved(self):
         if not self.is_change:
             return True
-        outage_history = self.current_version.solution.outage.history_outage.all()[:2]
-        current, previous = outage_history
-        if current.resolved and not previous.resolved:
-            return True
-        return False
+        if "resolved" not in self.changes:
+            return False
+        return self.changes["resolved"].current
 
     def _add_resolved_comment(self):
         comment = "Outage has been resolved."
         self.slack_comments.append(comment)
         self.html_comments.append(comment)
 
-    def _add_suggested_outcome_comment(self):
-        value = dict(self.current_version.OUTCOME_CHOICES)[
-            self.current_version.suggested_outcome
-        ]
+    def _add_suggested_outcome_comment(self, change):
+        value = dict(self.current_version.OUTCOME_CHOICES)[change.current]
         comment = f"Suggested outcome changed to: {value}."
         self.slack_comments.append(comment)
         self.html_comments.append(comment)
 
-    def _resolved_at_changed(self):
-        return (
-            abs(
-                self.current_version.resolved_at.minute
-                - self.previous_version.resolved_at.minute
-            )
-            >= 2
-        )
-
-    def _add_resolved_at_comment(self):
-        slack_value = format_datetime(self.current_version.resolved_at.timestamp())
-        html_value = format_outage_datetime(self.current_version.resolved_at)
+    def _add_resolved_at_comment(self, change):
+        slack_value = format_datetime(change.current.timestamp())
+        html_value = format_outage_datetime(change.current)
         comment = "Resolved at changed to: {}."
         self.slack_comments.append(comment.format(slack_value))
         self.html_comments.append(comment.format(html_value))
 
-    def _started_at_changed(self):
-        outage = self.current_version.solution.outage
-        current, previous = outage.history_outage.all()[:2]
-        return abs(current.started_at.minute - previous.started_at.minute) >= 2
-
-    def _add_started_at_comment(self):
-        slack_value = format_datetime(
-            self.current_version.solution.outage.started_at.timestamp()
-        )
-        html_value = format_outage_datetime(
-            self.current_version.solution.outage.started_at
-        )
+    def _add_started_at_comment(self, change):
+        slack_value = format_datetime(self.outage.started_at.timestamp())
+        html_value = format_outage_datetime(self.outage.started_at)
         comment = "Started at changed to: {}."
         self.slack_comments.append(comment.format(slack_value))
         self.html_comments.append(comment.format(html_value))
 
-    def _sales_affected_choice_changed(self):
-        outage_history = self.current_version.solution.outage.history_outage.all()[:2]
-        current, previous = outage_history
-        return current.sales_affected_choice != previous.sales_affected_choice
-
-    def _b2b_partners_affected_choice_changed(self):
-        outage_history = self.current_version.solution.outage.history_outage.all()[:2]
-        current, previous = outage_history
-        return (
-            current.b2b_partners_affected_choice
-            != previous.b2b_partners_affected_choice
-        )
-
-    def _add_sales_affected_choice_comment(self):
-        value = self.current_version.solution.outage.sales_affected_choice_human
+    def _add_sales_affected_choice_comment(self, change):
+        value = self.outage.sales_affected_choice_human
         comment = f"Sales affected changed to: {value}."
         self.slack_comments.append(comment)
         self.html_comments.append(comment)
 
-    def _add_b2b_partners_affected_choice_comment(self):
-        value = self.current_version.solution.outage.b2b_partners_affected_choice_human
+    def _add_b2b_partners_affected_choice_comment(self, change):
+        value = self.outage.b2b_partner_affected_choice_human
         comment = f"B2B Partners affected changed to: {value}."
         self.slack_comments.append(comment)
         self.html_comments.append(comment)
 
-    def _sales_affected_changed(self):
-        outage_history = self.current_version.solution.outage.history_outage.all()[:2]
-        current, previous = outage_history
-        return current.sales_affected != previous.sales_affected
-
-    def _add_sales_affected_comment(self):
-        value = self.current_version.solution.outage.sales_affected
+    def _add_sales_affected_comment(self, change):
+        value = self.outage.sales_affected
         comment = f"Sales affected details changed to: {value}."
         self.slack_comments.append(comment)
         self.html_comments.append(comment)
@@ -439,11 +439,20 @@ class SolutionComment(CommentBase):
 
 def generate_comments(outage):
     if outage.resolved:
-        history = outage.solution.solution_history.all()[:2]
-        comment = SolutionComment(outage, history)
+        history = latest_versions(outage.solution.solution_history)
+        changes = diff(history, SOLUTION_FIELDS)
+        if len(history) == 2:
+            outage_history = latest_versions(outage.history_outage)
+            # Outage is saved before solution, its version belongs to this
+            # change only if recorded after the previous solution version.
+            if outage_history[0].timestamp > history[1].created:
+                changes += diff(outage_history, RESOLVED_OUTAGE_FIELDS)
+        comment = SolutionComment(outage, history, changes)
     else:
-        history = outage.history_outage.all()[:2]
-        comment = OutageComment(outage, history)
+        history = latest_versions(
+            outage.history_outage, "solution_assignee", "communication_assignee"
+        )
+        comment = OutageComment(outage, history, diff(history, OUTAGE_FIELDS))
     comment.process()
 
 
@@ -455,7 +464,9 @@ def create_or_update_announcement(outage_pk, check_history=False):
     # retrieve outage
     try:
         with transaction.atomic():
-            outage = Outage.objects.select_for_update().get(pk=outage_pk)
+            outage = load_outage(
+                outage_pk, Outage.objects.select_for_update(of=("self",))
+            )
             if not outage.announce_on_slack:
                 logger.info("Outage slack announcement disabled")
                 return
@@ -467,9 +478,10 @@ def create_or_update_announcement(outage_pk, check_history=False):
             channel_id = announcement.channel_id
             create_new = message_ts is None
             method = "chat.postMessage" if create_new else "chat.update"
-            solution = outage.is_resolved
+            snapshot = OutageSnapshot.from_outage(outage, announcement)
+            solution = snapshot.is_resolved
 
-            attachments = generate_slack_message(outage, announcement)
+            attachments = render_slack_message(snapshot)
 
             resp = slack_client.api_call(
                 method, channel=channel_id, ts=message_ts, attachments=attachments
@@ -479,24 +491,34 @@ def create_or_update_announcement(outage_pk, check_history=False):
                 get_outage_slack_permalink(
                     announcement, channel_id, announcement.message_ts
                 )
-                announcement.save()
-            notify_sales_about_creation(announcement)
-            notify_b2b_about_creation(announcement)
+                announcement.save(update_fields=["message_ts", "permalink"])
+            if announcement.message_ts:
+                notify_sales_about_creation(announcement)
+                notify_b2b_about_creation(announcement)
 
+        side_effects = []
         if create_new:
-            notify_assigned(outage.solution_assignee.last_name, announcement.permalink)
-            notify_assigned(
-                outage.communication_assignee.last_name,
-                announcement.permalink,
-                assignee_type="Communication",
-            )
+            side_effects += [
+                notify_assigned.si(
+                    outage.solution_assignee.last_name, announcement.permalink
+                ),
+                notify_assigned.si(
+                    outage.communication_assignee.last_name,
+                    announcement.permalink,
+                    assignee_type="Communication",
+                ),
+            ]
 
-        if not solution and method == "chat.postMessage":
-            pin_message(channel_id, announcement.message_ts)
+        if not solution and create_new:
+            side_effects.append(pin_message.si(channel_id, announcement.message_ts))
         elif check_history:
             # check history
             generate_comments(outage)
 
+        if announcement.message_ts:
+            # Independent steps, executed concurrently and retried separately.
+            group(side_effects).apply_async()
+
         if solution:
             unpin_message(channel_id, announcement.message_ts)
     except DatabaseError:
@@ -514,9 +536,14 @@ def post_warning_to_user(user_id, text):
     )
 
 
-@shared_task
+@shared_task(**SIDE_EFFECT_TASK_OPTIONS)
 def pin_message(channel_id, message_ts):
-    slack_bot_client.api_call("pins.add", channel=channel_id, timestamp=message_ts)
+    resp = slack_bot_client.api_call(
+        "pins.add", channel=channel_id, timestamp=message_ts
+    )
+    if not resp["ok"]:
+        logger.error(f"Pinning message failed: {resp['error']}")
+        raise_for_retryable_error(resp)
 
 
 @shared_task
@@ -525,7 +552,11 @@ def unpin_message(channel_id, message_ts):
 
 
 @shared_task
-def add_comment(message_ts, channel_id, comment, icon_url=None, username=None):
+def add_comment(message_ts, channel_id, comment, **options):
+    """Post comment to thread of message.
+
+    `options` of the message, e.g. `blocks`, `icon_url` and `username`.
+    """
     resp = slack_client.api_call(
         "chat.postMessage",
         channel=channel_id,
@@ -533,170 +564,112 @@ def add_comment(message_ts, channel_id, comment, icon_url=None, username=None):
         text=comment,
         unfurl_links=True,
         as_user=False,
-        icon_url=icon_url,
-        username=username,
+        **options,
     )
     return resp
 
 
-@shared_task
-def notify_users():
-    now = arrow.utcnow().shift(minutes=settings.NOTIFY_BEFORE_ETA)
-    for outage in Outage.objects.filter(resolved=False):
-        eta_deadline = outage.eta_deadline
-        if not eta_deadline:
+def remind_eta_deadline(outage):
+    """Notify involved users that ETA deadline of outage is close or passed."""
+    announcement = outage.announcement
+    formated_eta = format_datetime(outage.eta_deadline.timestamp())
+    notified = []
+    for assignee in outage.get_involved_users():
+        user_slack_id = assignee.last_name
+        if not user_slack_id:
+            logger.warning(
+                f"Unable to send notification to user {assignee.email} "
+                f"because slack id is unknown"
+            )
             continue
-        if arrow.get(outage.eta_deadline) < now:
-            announcement = outage.announcement
-            assignees = outage.get_involved_users()
-            notified = []
-            for assignee in assignees:
-                user_slack_id = assignee.last_name
-                if not user_slack_id:
-                    logger.warning(
-                        f"Unable to send notification to user {assignee.email} "
-                        f"because slack id is unknown"
-                    )
-                    continue
-
-                if user_slack_id in notified:
-                    continue
-                formated_eta = format_datetime(outage.eta_deadline.timestamp)
-                notify_user_with_im(
-                    user_slack_id,
-                    attachments=[
-                        {
-                            "callback_id": outage.id,
-                            "fallback": f"Outage {outage.id} not resolved. ETA: {formated_eta}",
-                            "color": "danger",
-                            "title": "Notification: Outage not resolved",
-                            "title_link": announcement.permalink,
-                            "text": outage.summary,
-                            "fields": [
-                                {"title": "ETA", "value": formated_eta, "short": False}
-                            ],
-                        }
-                    ],
-                )
-                notified.append(user_slack_id)
-                logger.info(f"User {assignee.email} notified.")
 
-
-def update_or_create_user(kwargs):
-    user_model = kwargs["user_model"]
-    try:
-        user = user_model.objects.get(email=kwargs["kiwibase_email"])
-        if user.last_name != kwargs["slack_id"]:
-            user.last_name = kwargs["slack_id"]
-            user.save()
-        if hasattr(user, "profile"):
-            user.profile.timezone = kwargs["slack_timezone"]
-            user.profile.image_48_url = kwargs["slack_image_48_url"]
-            user.profile.slack_username = kwargs["slack_username"]
-            user.profile.save()
-        else:
-            profile = Profile(
-                user=user,
-                timezone=kwargs["slack_timezone"],
-                image_48_url=kwargs["slack_image_48_url"],
-                slack_username=kwargs["slack_username"],
-            )
-            profile.save()
-    except user_model.DoesNotExist:
-        try:
-            user = user_model.objects.create_user(
-                username=kwargs["slack_id"],
-                email=kwargs["kiwibase_email"],
-                last_name=kwargs["slack_id"],
-            )
-        except IntegrityError:
-            logger.error(f'User with slack ID {kwargs["slack_id"]} has changed email.')
-            return
-        profile = Profile(
-            user=user,
-            timezone=kwargs["slack_timezone"],
-            image_48_url=kwargs["slack_image_48_url"],
-            slack_username=kwargs["slack_username"],
+        if user_slack_id in notified:
+            continue
+        notify_user_with_im(
+            user_slack_id,
+            attachments=[
+                {
+                    "callback_id": outage.id,
+                    "fallback": f"Outage {outage.id} not resolved. ETA: {formated_eta}",
+                    "color": "danger",
+                    "title": "Notification: Outage not resolved",
+                    "title_link": announcement.permalink,
+                    "text": outage.summary,
+                    "fields": [{"title": "ETA", "value": formated_eta, "short": False}],
+                }
+            ],
         )
-        profile.save()
-        logger.info(f"Created {user}")
+        notified.append(user_slack_id)
+        logger.info(f"User {assignee.email} notified.")
 
 
-@shared_task  # Ignore RadonBear
-def sync_users():
-    logger.info("Starting script for getting info about employees.")
-    cursor = ""
-    LIMIT = 200
-    count = 1
-    logger.info("LIMIT for users.lists %s", LIMIT)
-
-    kwargs = {"user_model": get_user_model()}
-
-    failures = 0
-
-    # get all slack members
-    while True:
-        logger.debug("Getting %s. list of %s employees", count, LIMIT)
-        response = slack_client.api_call("users.list", limit=LIMIT, cursor=cursor)
-
-        # check limited api calls and sleep for a while
-        if not response["ok"]:
-            failures += 1
-            if failures == 5:
-                logger.warning("Failed %s times. Exiting...", failures)
-                break
-            logger.info(
-                "Bad response %s. Sleeping 20sec... - Failures: %s", response, failures
-            )
-            time.sleep(20)
-            continue
+def get_reminded_outages():
+    return Outage.objects.filter(resolved=False).select_related(
+        "announcement", "created_by", "solution_assignee", "communication_assignee"
+    )
 
-        logger.debug("Response %s. OK", count)
-        # parse user info to user profile+id
-        for member in response["members"]:
-            new_profile = dict()
-
-            if member["is_bot"]:
-                logger.info("Got bot %s", member["profile"])
-                continue
-
-            try:
-                kwargs["slack_id"] = member["id"]
-                kwargs["slack_email"] = member["profile"]["email"]
-                kwargs["slack_timezone"] = member["tz"]
-                kwargs["slack_image_48_url"] = member["profile"]["image_48"]
-                kwargs["slack_username"] = member["profile"]["display_name"]
-                if not kwargs["slack_username"]:
-                    kwargs["slack_username"] = member["profile"]["real_name"]
-            except KeyError as e:
-                cause = e.args[0]
-                logger.info("missing %s - %s", cause, member)
-                continue
-            new_profile["email"] = kwargs["slack_email"]
-            if "skypicker" in kwargs["slack_email"]:
-                logger.info(kwargs["slack_email"])
-            kiwibase_email = transfrom_slack_email_domain(kwargs["slack_email"])
-            if not kiwibase_email:
-                continue
-            kwargs["kiwibase_email"] = kiwibase_email
-
-            update_or_create_user(kwargs)
-
-        if "response_metadata" in response:
-            cursor = response["response_metadata"]["next_cursor"]
-            count += 1
-        else:
-            cursor = ""
 
-        if cursor == "":
-            break
+def schedule_eta_reminder(outage_id, eta_deadline, **options):
+    """Remind ETA deadline `NOTIFY_BEFORE_ETA` minutes before it passes.
+
+    `options` are passed to `timers.schedule`.
+    """
+    timers.schedule(
+        f"eta-reminder:{outage_id}",
+        eta_deadline - timedelta(minutes=settings.NOTIFY_BEFORE_ETA),
+        notify_eta_deadline.name,
+        outage_id,
+        eta_deadline.isoformat(),
+        **options,
+    )
 
 
 @shared_task
+def notify_eta_deadline(outage_id, eta_deadline):
+    """Remind users of deadline, unless it was changed meanwhile.
+
+    Reminder is repeated every `ETA_REMINDER_INTERVAL` until the outage
+    is resolved or its ETA changed.
+    """
+    eta_deadline = arrow.get(eta_deadline).datetime
+    outage = get_reminded_outages().filter(pk=outage_id, eta_deadline=eta_deadline)
+    outage = outage.first()
+    if outage is None:
+        logger.info(f"ETA of outage {outage_id} changed, reminder not sent")
+        return
+    remind_eta_deadline(outage)
+    timers.schedule(
+        f"eta-reminder:{outage_id}",
+        timezone.now() + ETA_REMINDER_INTERVAL,
+        notify_eta_deadline.name,
+        outage_id,
+        eta_deadline.isoformat(),
+    )
+
+
+@shared_task
+def notify_users():
+    """Remind users of all outages after their ETA deadline passed."""
+    outages = get_reminded_outages().filter(eta_deadline__lte=timezone.now())
+    for outage in outages:
+        remind_eta_deadline(outage)
+
+
+@shared_task
+def sync_users():
+    """Synchronize users and profiles with Slack workspace members."""
+    from .user_sync import fetch_pages, sync
+
+    return asdict(sync(fetch_pages()))
+
+
+@shared_task
+@single_run(timeout=3600)
 def join_datadog_channels():
     """Invite slack bot into datadog channels."""
     datadog_slack_channels = get_all_slack_channels()
     join_channels(datadog_slack_channels)
+    return len(datadog_slack_channels)
 
 
 @shared_task
@@ -706,41 +679,61 @@ def sync_monitor_details_task(monitor_id):
 
 
 @shared_task
+@single_run(timeout=3600)
 def sync_user_groups_with_google():
+    """Make members of allowed Google groups exactly the members of on_call group.
+
+    Return number of added and removed members.
+    """
     if not settings.GOOGLE_SERVICE_ACCOUNT:
         logger.info("GOOGLE_SERVICE_ACCOUNT not configured skipping...")
-        return
-    directory_api = get_directory_api()
-    google_groups = GoogleGroup.objects.filter(is_allowed=True)
-
-    group = Group.objects.get(name="on_call")
-
-    for google_group in google_groups:
-        next_page_token = None
-        while True:
-            response = (
-                directory_api.members()
-                .list(groupKey=google_group.key, pageToken=next_page_token)
-                .execute()
+        return None
+    group_keys = list(
+        GoogleGroup.objects.filter(is_allowed=True).values_list("key", flat=True)
+    )
+    if not group_keys:
+        logger.info("No allowed Google groups, skipping...")
+        return None
+    emails = get_groups_member_emails(group_keys)
+
+    user_model = get_user_model()
+    on_call_group = Group.objects.get(name="on_call")
+    users = dict(user_model.objects.filter(email__in=emails).values_list("email", "id"))
+    for email in emails - users.keys():
+        logger.warning(f"User {email} is not in phoenix database")
+    desired = set(users.values())
+    membership = user_model.groups.through
+    with transaction.atomic():
+        current = set(
+            membership.objects.filter(group=on_call_group).values_list(
+                "user_id", flat=True
             )
-            members = response["members"]
+        )
+        added, removed = desired - current, current - desired
+        membership.objects.filter(group=on_call_group, user_id__in=removed).delete()
+        membership.objects.bulk_create(
+            [membership(group=on_call_group, user_id=user_id) for user_id in added]
+        )
+    logger.info(
+        f"on_call group synchronized: {len(added)} added, {len(removed)} removed"
+    )
+    return len(added) + len(removed)
 
-            for member in members:
-                email = member["email"]
 
-                user_model = get_user_model()
-                try:
-                    user = user_model.objects.get(email=email)
-                    user.groups.add(group)
-                except user_model.DoesNotExist:
-                    logger.warning(f"User {email} is not in phoenix database")
+@shared_task
+@single_run(timeout=3600)
+def sync_postmortem_issues(full=False):
+    """Update local copy of postmortem issues, see `PostmortemIssue`."""
+    from ..integration import gitlab
 
-            next_page_token = response.get("nextPageToken")
-            if not next_page_token:
-                break
+    if not settings.GITLAB_PRIVATE_TOKEN:
+        logger.info("No gitlab private token. Skipping postmortem issues sync")
+        return None
+    return gitlab.sync_postmortem_issues(full=full)
 
 
 @shared_task
+@single_run(timeout=3600)
 def notify_users_with_due_date_postmortems():
     logger.info("Starting: notify_users_with_due_date_postmortems")
     if not settings.GITLAB_PRIVATE_TOKEN:
@@ -776,59 +769,102 @@ def notify_users_with_due_date_postmortems():
                 )
 
 
+@shared_task
+@single_run(timeout=21600)
+def compact_history():
+    from ..core.archive import compact
+
+    totals = compact()
+    return sum(removed + archived for removed, archived in totals.values())
+
+
 @shared_task(time_limit=5)
 def test_task():
     return "Pong"
 
 
 def notify_sales_about_creation(announcement):
-    if (
-        not all(
-            (
-                announcement.outage.sales_has_been_affected,
-                settings.SLACK_NOTIFY_SALES_CHANNEL_ID,
-            )
+    if not all(
+        (
+            announcement.outage.sales_has_been_affected,
+            settings.SLACK_NOTIFY_SALES_CHANNEL_ID,
         )
-        or announcement.sales_notified
     ):
         return
-    announcement_url = announcement.permalink
+    from .outbox import enqueue
+
     msg = "New outage affecting sales has been announced"
-    if announcement_url:
-        msg += f": {announcement_url}"
-    data = slack_client.api_call(
-        "chat.postMessage", channel=settings.SLACK_NOTIFY_SALES_CHANNEL_ID, text=msg
+    if announcement.permalink:
+        msg += f": {announcement.permalink}"
+    enqueue(
+        f"outage:{announcement.outage_id}:sales-created",
+        settings.SLACK_NOTIFY_SALES_CHANNEL_ID,
+        msg,
     )
-    if not data["ok"]:
-        logger.error(f"Outage creation notification failed: {data['error']}")
-        return
-    announcement.sales_notified = True
-    announcement.save()
 
 
 def notify_b2b_about_creation(announcement):
-    if (
-        not all(
-            (
-                announcement.outage.b2b_partner_has_been_affected,
-                settings.SLACK_NOTIFY_B2B_CHANNEL_ID,
-            )
+    if not all(
+        (
+            announcement.outage.b2b_partner_has_been_affected,
+            settings.SLACK_NOTIFY_B2B_CHANNEL_ID,
         )
-        or announcement.b2b_notified
     ):
         return
-    announcement_url = announcement.permalink
+    from .outbox import enqueue
+
     msg = "New outage affecting B2B Partners has been announced"
-    if announcement_url:
-        msg += f": {announcement_url}"
-    data = slack_client.api_call(
-        "chat.postMessage", channel=settings.SLACK_NOTIFY_B2B_CHANNEL_ID, text=msg
+    if announcement.permalink:
+        msg += f": {announcement.permalink}"
+    enqueue(
+        f"outage:{announcement.outage_id}:b2b-created",
+        settings.SLACK_NOTIFY_B2B_CHANNEL_ID,
+        msg,
     )
-    if not data["ok"]:
-        logger.error(f"Outage creation notification failed: {data['error']}")
-        return
-    announcement.b2b_notified = True
-    announcement.save()
+
+
+@shared_task
+@single_run(timeout=60)
+def dispatch_timers():
+    """Send tasks of due timers, see `phoenix.core.timers`."""
+    return timers.dispatch()
+
+
+@shared_task
+@single_run(timeout=600)
+def sync_timers():
+    """Register timers missing in Redis, e.g. after it lost data.
+
+    Timers already registered are kept untouched. Due timers may have been
+    just popped with their task still waiting in queue, so they are set to
+    fire after `TIMER_RESYNC_DELAY`, when the task has moved the deadline.
+    """
+    options = {"replace": False, "not_before": timezone.now() + TIMER_RESYNC_DELAY}
+    outages = list(
+        Outage.objects.filter(resolved=False).only("eta_deadline", "next_update_due_at")
+    )
+    for outage in outages:
+        if outage.eta_deadline:
+            schedule_eta_reminder(outage.pk, outage.eta_deadline, **options)
+        if outage.next_update_due_at:
+            schedule_update_request(outage.pk, outage.next_update_due_at, **options)
+    solutions = list(
+        get_postmortem_reminded_solutions()
+        .filter(Q(report_url__isnull=True) | Q(report_url=""))
+        .only("created")
+    )
+    for solution in solutions:
+        schedule_postmortem_reminder(solution.pk, solution.created, **options)
+    return len(outages) + len(solutions)
+
+
+@shared_task
+@single_run(timeout=300)
+def dispatch_outbox():
+    """Deliver pending Slack messages recorded in outbox."""
+    from .outbox import dispatch
+
+    return dispatch()
 
 
 def send_to_slack(csv_report, channel, comment=None):
@@ -845,6 +881,7 @@ def send_to_slack(csv_report, channel, comment=None):
 
 
 @shared_task
+@single_run(timeout=3600)
 def generate_after_due_date_issues_report():
     """Retrieve gitlab issues after due date and create report."""
     issues = get_issues_after_due_date()
@@ -875,7 +912,7 @@ def generate_after_due_date_issues_report():
                     fieldnames[1]: issue.title,
                     fieldnames[2]: issue.web_url,
                     fieldnames[3]: issue.due_date,
-                    fieldnames[4]: issue.author["username"],
+                    fieldnames[4]: issue.author_username,
                     fieldnames[5]: ";".join([a["username"] for a in issue.assignees]),
                     fieldnames[6]: action_items or "",
                     fieldnames[7]: open_issues or "",
@@ -884,19 +921,20 @@ def generate_after_due_date_issues_report():
         fw.seek(0)
         send_to_slack(fw, settings.SLACK_POSTMORTEM_REPORT_CHANNEL, comment=comment)
         fw.seek(0)
+    return num_of_issues
 
 
 def postmortem_slack_notify(solution):
-    if solution.postmortem_notifications.slack_notified:
-        return
+    from .outbox import enqueue
+
     user = solution.created_by
     announcement_url = solution.outage.announcement.permalink
-    notify_user_with_im(
+    enqueue(
+        f"solution:{solution.id}:postmortem-reminder",
         user.last_name,
-        message=f"Please create postmortem report for this announcement {announcement_url}",
+        f"Please create postmortem report for this announcement {announcement_url}",
+        direct=True,
     )
-    solution.postmortem_notifications.slack_notified = True
-    solution.postmortem_notifications.save()
 
 
 def is_postmortem_missing_label(solution):
@@ -910,52 +948,113 @@ def is_postmortem_missing_label(solution):
     return not settings.POSTMORTEM_LABEL in gl_issue.labels
 
 
-@shared_task
-def postmortem_notifications():
+def get_postmortem_reminded_solutions():
     list_limit = (
         arrow.now().shift(hours=-settings.POSTMORTEM_NOTIFICATION_LIST_LIMIT).datetime
     )
+    return Solution.objects.outcome_is_postmortem().filter(created__gte=list_limit)
+
+
+@shared_task
+def postmortem_notifications():
     slack_limit = (
         arrow.now().shift(hours=-settings.POSTMORTEM_SLACK_NOTIFICATION_LIMIT).datetime
     )
-
     solutions = (
-        Solution.objects.outcome_is_postmortem()
-        .filter(created__gte=list_limit)
+        get_postmortem_reminded_solutions()
         .filter(created__lte=slack_limit)
+        .select_related("created_by", "outage__announcement")
     )
     for solution in solutions:
         if solution.missing_postmortem:
             postmortem_slack_notify(solution)
 
 
-def communication_assignee_should_be_notified(outage):
-    now = arrow.now()
-    last_notified = outage.communication_assignee_last_notified
-    if not last_notified:
-        # Before the first notification.
-        last_notified = outage.created
-    seconds_passed = (now - last_notified).total_seconds()
-    return seconds_passed >= settings.NOTIFY_COMMUNICATION_ASSIGNEE_MINUTES * 60
+def schedule_postmortem_reminder(solution_id, created, **options):
+    """Remind missing postmortem once `POSTMORTEM_SLACK_NOTIFICATION_LIMIT` passes."""
+    timers.schedule(
+        f"postmortem-reminder:{solution_id}",
+        created + timedelta(hours=settings.POSTMORTEM_SLACK_NOTIFICATION_LIMIT),
+        notify_missing_postmortem.name,
+        solution_id,
+        **options,
+    )
 
 
 @shared_task
-def notify_communication_assignee():
-    for outage in Outage.objects.filter(resolved=False):
-        if communication_assignee_should_be_notified(outage):
-            communication_assignee = outage.communication_assignee
-            user_slack_id = communication_assignee.last_name
-            if not user_slack_id:
-                logger.warning(
-                    f"Unable to retrieve communication assignee slack id for "
-                    "user: {communication_assignee.id}"
-                )
-            notified = notify_user_with_im(
-                user_slack_id,
-                message=f"Please provide an update on this outage: {outage.announcement.permalink}\n"
-                f"As communication assignee, we will ask you every "
-                f"{settings.NOTIFY_COMMUNICATION_ASSIGNEE_MINUTES} minutes to provide an update.",
+def notify_missing_postmortem(solution_id):
+    solution = (
+        get_postmortem_reminded_solutions()
+        .filter(pk=solution_id)
+        .select_related("created_by", "outage__announcement")
+        .first()
+    )
+    if solution is not None and solution.missing_postmortem:
+        postmortem_slack_notify(solution)
+
+
+def schedule_update_request(outage_id, due, **options):
+    timers.schedule(
+        f"update-request:{outage_id}",
+        due,
+        notify_communication_assignee.name,
+        [outage_id],
+        **options,
+    )
+
+
+@shared_task
+def notify_communication_assignee(outage_ids=None):
+    """Ask communication assignees of outages due for an update to provide it.
+
+    Only given outages are checked if `outage_ids` are set. Due outages are
+    claimed by moving them to retry time first, so runs started by timers
+    or manually at the same time never ask for the same update twice.
+    """
+    now = timezone.now()
+    retry_at = now + UPDATE_REQUEST_RETRY_DELAY
+    with transaction.atomic():
+        outages = (
+            Outage.objects.select_for_update(skip_locked=True, of=("self",))
+            .filter(resolved=False, next_update_due_at__lte=now)
+            .select_related("announcement", "communication_assignee")
+        )
+        if outage_ids is not None:
+            outages = outages.filter(pk__in=outage_ids)
+        outages = list(outages)
+        if outages:
+            Outage.objects.filter(pk__in=[outage.pk for outage in outages]).update(
+                next_update_due_at=retry_at
+            )
+    notified_ids = []
+    failed_ids = []
+    for outage in outages:
+        communication_assignee = outage.communication_assignee
+        user_slack_id = communication_assignee.last_name
+        if not user_slack_id:
+            logger.warning(
+                f"Unable to retrieve communication assignee slack id for "
+                f"user: {communication_assignee.id}"
             )
-            if notified:
-                outage.communication_assignee_notified()
-                outage.save()
+            failed_ids.append(outage.pk)
+            continue
+        notified = notify_user_with_im(
+            user_slack_id,
+            message=f"Please provide an update on this outage: {outage.announcement.permalink}\n"
+            f"As communication assignee, we will ask you every "
+            f"{settings.NOTIFY_COMMUNICATION_ASSIGNEE_MINUTES} minutes to provide an update.",
+        )
+        if notified:
+            notified_ids.append(outage.pk)
+        else:
+            failed_ids.append(outage.pk)
+    # Claimed outages are due at retry time, timer is popped already.
+    for outage_id in failed_ids:
+        schedule_update_request(outage_id, retry_at)
+    # Bookkeeping only, no history or announcement update is needed.
+    next_update_due_at = Outage.get_next_update_due_at(now)
+    Outage.objects.filter(pk__in=notified_ids).update(
+        communication_assignee_last_notified=now, next_update_due_at=next_update_due_at
+    )
+    for outage_id in notified_ids:
+        schedule_update_request(outage_id, next_update_due_at)
@@ -0,0 +1,285 @@
+"""Synchronization of Slack workspace members into users and profiles.
+
+Existing users with their profiles are loaded once into in-memory index
+keyed by email. Every page of members is diffed against it and only
+changed rows are written by bulk queries, one transaction per page.
+Next pages are fetched from Slack by background thread meanwhile.
+
+Slack ID of every member is mirrored to `SlackMember` table, which is used
+for all lookups of users by Slack ID. Slack events update single members
+by `save_member`.
+"""
+from dataclasses import asdict, dataclass
+import itertools
+import logging
+import queue
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from ..core.models import Profile
+from .bot import slack_client
+from .models import SlackMember
+from .utils import link_slack_member, retrieve_user, transfrom_slack_email_domain
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 200
+MAX_FAILURES = 5
+FAILURE_DELAY = 20
+# Maximum number of pages fetched ahead of the page being written.
+PREFETCH_PAGES = 2
+
+PROFILE_FIELDS = ("timezone", "image_48_url", "slack_username")
+
+
+@dataclass(frozen=True)
+class Member:
+    slack_id: str
+    email: str
+    timezone: str
+    image_48_url: str
+    slack_username: str
+
+    def get_profile_values(self):
+        return {field: getattr(self, field) for field in PROFILE_FIELDS}
+
+
+@dataclass
+class SyncStats:
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    failed: int = 0
+
+
+def parse_member(member):
+    """Return `Member` or None for bots and incomplete members."""
+    if member["is_bot"]:
+        logger.info("Got bot %s", member["profile"])
+        return None
+    try:
+        profile = member["profile"]
+        parsed = Member(
+            slack_id=member["id"],
+            email=profile["email"],
+            timezone=member["tz"],
+            image_48_url=profile["image_48"],
+            slack_username=profile["display_name"] or profile["real_name"],
+        )
+    except KeyError as e:
+        logger.info("missing %s - %s", e.args[0], member)
+        return None
+    email = transfrom_slack_email_domain(parsed.email)
+    if not email:
+        return None
+    return Member(**{**asdict(parsed), "email": email})
+
+
+def fetch_pages():
+    """Yield pages of members from `users.list`, retrying failed requests."""
+    cursor = ""
+    failures = 0
+    while True:
+        response = slack_client.api_call("users.list", limit=PAGE_SIZE, cursor=cursor)
+        if not response["ok"]:
+            failures += 1
+            if failures == MAX_FAILURES:
+                logger.warning("Failed %s times. Exiting...", failures)
+                return
+            logger.info(
+                "Bad response %s. Sleeping %ssec... - Failures: %s",
+                response,
+                FAILURE_DELAY,
+                failures,
+            )
+            time.sleep(FAILURE_DELAY)
+            continue
+        yield response["members"]
+        cursor = response.get("response_metadata", {}).get("next_cursor", "")
+        if not cursor:
+            return
+
+
+def prefetch(items, size):
+    """Iterate `items` produced by background thread, up to `size` ahead.
+
+    Exception raised by producer is re-raised by the iterator. Producer
+    stops when the iterator is closed early. It must not use database,
+    connections are not shared between threads.
+    """
+    buffer = queue.Queue(maxsize=size)
+    stopped = threading.Event()
+    done = object()
+
+    def put(item):
+        while not stopped.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put((item, None)):
+                    return
+        except Exception as e:  # pylint: disable=broad-except
+            put((done, e))
+        else:
+            put((done, None))
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            item, error = buffer.get()
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            yield item
+    finally:
+        stopped.set()
+        producer.join()
+
+
+class UserIndex:
+    """Users with profiles by email, taken usernames and Slack IDs."""
+
+    def __init__(self):
+        users = get_user_model().objects.select_related("profile", "slack_member")
+        self.by_email = {user.email: user for user in users}
+        self.usernames = {user.username for user in self.by_email.values()}
+        self.slack_ids = dict(SlackMember.objects.values_list("slack_id", "user_id"))
+
+    def add(self, user):
+        self.by_email[user.email] = user
+        self.usernames.add(user.username)
+
+
+def sync_page(members, index, stats):
+    """Write changes of one page of members in single transaction."""
+    user_model = get_user_model()
+    new_users, changed_users, new_profiles, changed_profiles = [], [], [], []
+    new_slack_members, changed_slack_members = [], []
+    for member in filter(None, map(parse_member, members)):
+        user = index.by_email.get(member.email)
+        if user is None:
+            if member.slack_id in index.usernames or member.slack_id in index.slack_ids:
+                logger.error(f"User with slack ID {member.slack_id} has changed email.")
+                stats.failed += 1
+                continue
+            user = user_model(
+                username=member.slack_id,
+                email=user_model.objects.normalize_email(member.email),
+                last_name=member.slack_id,
+            )
+            user.set_unusable_password()
+            index.add(user)
+            new_users.append((user, member))
+            stats.created += 1
+            continue
+
+        owner_id = index.slack_ids.get(member.slack_id)
+        if owner_id is not None and owner_id != user.pk:
+            logger.error(f"Slack ID {member.slack_id} belongs to another user.")
+            stats.failed += 1
+            continue
+        changed = False
+        if user.last_name != member.slack_id:
+            user.last_name = member.slack_id
+            changed_users.append(user)
+            changed = True
+        try:
+            slack_member = user.slack_member
+        except SlackMember.DoesNotExist:
+            new_slack_members.append(SlackMember(user=user, slack_id=member.slack_id))
+            changed = True
+        else:
+            if slack_member.slack_id != member.slack_id:
+                del index.slack_ids[slack_member.slack_id]
+                slack_member.slack_id = member.slack_id
+                changed_slack_members.append(slack_member)
+                changed = True
+        index.slack_ids[member.slack_id] = user.pk
+        values = member.get_profile_values()
+        try:
+            profile = user.profile
+        except Profile.DoesNotExist:
+            new_profiles.append(Profile(user=user, **values))
+            changed = True
+        else:
+            if any(getattr(profile, field) != value for field, value in values.items()):
+                for field, value in values.items():
+                    setattr(profile, field, value)
+                changed_profiles.append(profile)
+                changed = True
+        if changed:
+            stats.updated += 1
+        else:
+            stats.unchanged += 1
+
+    with transaction.atomic():
+        # Primary keys are set by bulk_create on PostgreSQL.
+        user_model.objects.bulk_create([user for user, _ in new_users])
+        for user, member in new_users:
+            user.profile = Profile(user=user, **member.get_profile_values())
+            new_profiles.append(user.profile)
+            user.slack_member = SlackMember(user=user, slack_id=member.slack_id)
+            new_slack_members.append(user.slack_member)
+            index.slack_ids[member.slack_id] = user.pk
+        user_model.objects.bulk_update(changed_users, ["last_name"])
+        Profile.objects.bulk_create(new_profiles)
+        Profile.objects.bulk_update(changed_profiles, PROFILE_FIELDS)
+        SlackMember.objects.bulk_update(changed_slack_members, ["slack_id"])
+        SlackMember.objects.bulk_create(new_slack_members)
+
+
+def save_member(member):
+    """Create or update user, profile and Slack ID of single member."""
+    with transaction.atomic():
+        user = retrieve_user(slack_member__slack_id=member.slack_id) or retrieve_user(
+            email=member.email
+        )
+        if user is None:
+            user = get_user_model().objects.create_user(
+                member.slack_id, member.email, last_name=member.slack_id
+            )
+        elif user.last_name != member.slack_id:
+            user.last_name = member.slack_id
+            user.save(update_fields=["last_name"])
+        Profile.objects.update_or_create(
+            user=user, defaults=member.get_profile_values()
+        )
+        link_slack_member(user, member.slack_id)
+    return user
+
+
+def sync(pages):
+    """Synchronize users with members from `pages`, return `SyncStats`.
+
+    Pages are prefetched while the previous one is written.
+    """
+    index = UserIndex()
+    stats = SyncStats()
+    started = time.monotonic()
+    waited = 0
+    pages = prefetch(pages, PREFETCH_PAGES)
+    for number in itertools.count(1):
+        wait_started = time.monotonic()
+        page = next(pages, None)
+        waited += time.monotonic() - wait_started
+        if page is None:
+            break
+        sync_page(page, index, stats)
+        logger.info(f"Synchronized page {number} of Slack users: {stats}")
+    logger.info(
+        f"Slack users synchronized in {time.monotonic() - started:.1f}s, "
+        f"{waited:.1f}s waiting for Slack: {stats}"
+    )
+    return stats
@@ -6,6 +6,7 @@ import dateutil
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.sites.models import Site
+from django.db import transaction
 from rest_framework.response import Response
 
 from ..core.models import System
@@ -93,25 +94,47 @@ def retrieve_user(**kwargs):
         return None
 
 
+def get_slack_user(slack_id):
+    """Return user with Slack ID, by single indexed query."""
+    if not slack_id:
+        return None
+    return retrieve_user(slack_member__slack_id=slack_id)
+
+
+def link_slack_member(user, slack_id):
+    """Make `slack_id` Slack identity of `user`, replacing any previous one."""
+    from .models import SlackMember
+
+    SlackMember.objects.filter(slack_id=slack_id).exclude(user=user).delete()
+    SlackMember.objects.update_or_create(user=user, defaults={"slack_id": slack_id})
+
+
 def provision_slack_user(slack_id):
+    """Return user with Slack ID.
+
+    Members missing in `SlackMember` table (joined before `team_join` event
+    was delivered) are fetched from Slack once and added to it.
+    """
     if not slack_id:
         return None
 
-    user = retrieve_user(last_name=slack_id)
+    user = get_slack_user(slack_id)
     if not user:
         resp = slack_client.api_call("users.profile.get", user=slack_id)
         if resp["ok"]:
             slack_user_email = resp["profile"]["email"]
-            user = retrieve_user(email=slack_user_email)
-            if not user:
-                # user is a new one
-                user = get_user_model().objects.create_user(
-                    slack_id, slack_user_email, last_name=slack_id
-                )
-            else:
-                # user exists but we need to set his Slack ID
-                user.last_name = slack_id
-                user.save()
+            with transaction.atomic():
+                user = retrieve_user(email=slack_user_email)
+                if not user:
+                    # user is a new one
+                    user = get_user_model().objects.create_user(
+                        slack_id, slack_user_email, last_name=slack_id
+                    )
+                else:
+                    # user exists but we need to set his Slack ID
+                    user.last_name = slack_id
+                    user.save()
+                link_slack_member(user, slack_id)
     return user
 
 
@@ -5,7 +5,6 @@ import re
 import arrow
 import dateutil
 from django.conf import settings
-from django.contrib.auth import get_user_model
 from django.db import connections
 from django.db.utils import OperationalError
 from django.http import JsonResponse
@@ -21,7 +20,6 @@ from ..core.models import (  # Ignore PyImportSortBear
     Monitor,
     Outage,
     PostmortemNotifications,
-    Profile,
     Solution,
 )
 from ..core.utils import (
@@ -34,12 +32,12 @@ from .bot import slack_bot_client, slack_client
 from .models import Announcement
 from .tasks import create_channel as create_channel_task
 from .tasks import post_warning_to_user, share_message_to_announcement, test_task
+from .user_sync import parse_member, save_member
 from .utils import (
     get_slack_channel_name,
     get_system_option,
     provision_slack_user,
     resolved_at_to_utc,
-    retrieve_user,
     utc_to_user_time,
     verify_token,
 )
@@ -231,42 +229,9 @@ def handle_reaction_added(request, data):
 
 def handle_team_join(request, data):
     """Save every new member in slack workspace to database."""
-    data = data["event"]
-    user_data = data["user"]
-    if user_data["is_bot"]:
-        # Do not save bot users
-        logger.debug("Skipping bot user in team_join handler")
-        return
-    user_slack_id = user_data["id"]
-    user_email = user_data["profile"]["email"]
-    user_timezone = user_data["tz"]
-    image_48_url = user_data["profile"]["image_48"]
-    slack_username = user_data["profile"]["display_name"]
-    if not slack_username:
-        slack_username = user_data["profile"]["real_name"]
-
-    user = retrieve_user(email=user_email)
-    if user is None:
-        retrieve_user(last_name=user_slack_id)
-
-    if user is None:
-        user = get_user_model().objects.create_user(
-            user_slack_id, user_email, last_name=user_slack_id
-        )
-        profile = Profile(
-            user=user,
-            timezone=user_timezone,
-            image_48_url=image_48_url,
-            slack_username=slack_username,
-        )
-        profile.save()
-    else:
-        user.last_name = user_slack_id
-        user.profile.timezone = user_timezone
-        user.profile.image_48_url = image_48_url
-        user.profile.slack_username = slack_username
-        user.profile.save()
-        user.save()
+    member = parse_member(data["event"]["user"])
+    if member is not None:
+        save_member(member)
 
 
 def handle_url_verification(request, data):
@@ -276,23 +241,10 @@ def handle_url_verification(request, data):
 
 def handle_user_change(request, data):
     """Handle user changing profile data."""
-    user_data = data["event"]["user"]
-    if user_data["is_bot"]:
-        return
-
-    logger.debug(f"User data: {user_data}")
-    user_slack_id = user_data["id"]
-    slack_timezone = user_data["tz"]
-    image_48_url = user_data["profile"]["image_48"]
-    slack_username = user_data["profile"]["display_name"]
-    if not slack_username:
-        slack_username = user_data["profile"]["real_name"]
-    user = retrieve_user(last_name=user_slack_id)
-    if user:
-        user.profile.timezone = slack_timezone
-        user.profile.image_48_url = image_48_url
-        user.slack_username = slack_username
-        user.profile.save()
+    logger.debug(f"User data: {data['event']['user']}")
+    member = parse_member(data["event"]["user"])
+    if member is not None:
+        save_member(member)
 
 
 @api_view(["GET", "POST"])
@@ -532,7 +484,7 @@ class InteractiveMesssageHandler:
                 postmortem_notifications=pn,
             )
         else:
-            self.outage.solution.save(modified_by=self.actor)
+            self.outage.solution.save(modified_by=self.actor, force_history=True)
 
         if not self.outage.sales_affected_choice == Outage.UNKNOWN:
             sales_affected = self.outage.sales_affected_choice
@@ -0,0 +1,60 @@
+from datetime import timedelta
+
+from django.utils import timezone
+import pytest
+
+from phoenix.core.archive import compact, get_versions
+from phoenix.core.history import latest_versions, record_version
+from phoenix.core.models import Monitor, MonitorHistory, OutageHistory
+from phoenix.tests.utils import get_outage
+
+
+@pytest.mark.django_db
+def test_compact_outage_history(settings, tmp_path):
+    settings.HISTORY_ARCHIVE_DIR = str(tmp_path)
+    settings.HISTORY_ARCHIVE_AFTER_DAYS = 30
+    outage = get_outage()
+    record_version(outage, outage.history_outage)  # duplicate version
+    for eta in ("<2h", "<8h", "<24h"):
+        outage.eta = eta
+        outage.save()
+    old = timezone.now() - timedelta(days=60)
+    OutageHistory.objects.filter(outage=outage).update(timestamp=old)
+
+    assert compact(["outage"]) == {"outage": (1, 2)}
+
+    rows = list(outage.history_outage.order_by("pk"))
+    assert len(rows) == 2
+    assert rows[0].checkpoint, "First hot row should become checkpoint"
+    current, previous = latest_versions(outage.history_outage)
+    assert (current.eta, previous.eta) == ("<24h", "<8h")
+    assert current.summary == outage.summary
+
+    assert len(get_versions("outage", outage.pk)) == 2
+    versions = get_versions("outage", outage.pk, archived=True)
+    assert [version.eta for version in versions] == ["<24h", "<8h", "<2h", ""]
+
+
+@pytest.mark.django_db
+def test_compact_without_archive(settings):
+    settings.HISTORY_ARCHIVE_DIR = None
+    outage = get_outage()
+    old = timezone.now() - timedelta(days=2)
+    for _ in range(2):
+        record_version(outage, outage.history_outage)  # duplicate versions
+    outage.eta = "<2h"
+    outage.save()
+    OutageHistory.objects.filter(outage=outage).update(timestamp=old)
+
+    monitor = Monitor.objects.create(external_id="1", link="https://example.com")
+    for description in (None, None, "changed"):
+        monitor.description = description
+        monitor.save()
+    MonitorHistory.objects.filter(monitor=monitor).update(timestamp=old)
+
+    assert compact(["outage", "monitor"]) == {"outage": (2, 0), "monitor": (2, 0)}
+    assert outage.history_outage.count() == 2
+    assert [row.description for row in monitor.history.order_by("pk")] == [
+        None,
+        "changed",
+    ]
@@ -0,0 +1,36 @@
+import pytest
+
+from phoenix.core import live
+from phoenix.tests.utils import get_outage
+
+
+@pytest.mark.django_db(transaction=True)
+def test_outage_changes_streamed(settings):
+    settings.OUTAGE_STREAM_MAX_DURATION = 5
+    outage = get_outage()
+    events = live.stream(outage.pk)
+    assert next(events) == f"retry: {live.RECONNECT_DELAY}\n\n"
+
+    outage.summary = "database is down"
+    outage.save()
+    outage.add_notifications(["ETA changed"], None)
+
+    assert next(events) == live.format_event("values", {"summary": "database is down"})
+    assert "ETA changed" in next(events)
+    events.close()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_streams_limited_per_worker(settings):
+    settings.OUTAGE_STREAMS_PER_WORKER = 1
+    outage = get_outage()
+    first = live.stream(outage.pk)
+    assert next(first) == f"retry: {live.RECONNECT_DELAY}\n\n"
+
+    busy = live.format_event("busy", {"refresh": live.BUSY_REFRESH_INTERVAL})
+    assert list(live.stream(outage.pk)) == [busy]
+
+    first.close()
+    second = live.stream(outage.pk)
+    assert next(second) == f"retry: {live.RECONNECT_DELAY}\n\n"
+    second.close()
@@ -1,7 +1,10 @@
+from datetime import timedelta
+
 import arrow
 import pytest
 
-from phoenix.core.models import System
+from phoenix.core.history import get_version, latest_versions, versions_as_of
+from phoenix.core.models import Outage, SolutionHistory, System
 from phoenix.tests.utils import get_outage
 
 
@@ -37,3 +40,109 @@ def test_solution_real_downtime():
     end = arrow.get(o.solution.resolved_at)
     minutes = (end - start).seconds // 60
     assert o.solution.real_downtime == minutes, "Wrong real_downtime value"
+
+
+@pytest.mark.django_db
+def test_outage_history_deltas(settings):
+    settings.HISTORY_CHECKPOINT_INTERVAL = 2
+    o = get_outage()
+    for eta in ("<2h", "<8h", "<24h"):
+        o.eta = eta
+        o.save()
+
+    rows = list(o.history_outage.order_by("pk"))
+    assert [row.checkpoint for row in rows] == [True, False, False, True]
+    assert rows[1].changed_fields == ["eta"]
+    assert rows[1].summary is None, "Unchanged field should not be stored"
+
+    current, previous = latest_versions(o.history_outage)
+    assert (current.eta, previous.eta) == ("<24h", "<8h")
+    assert previous.summary == o.summary
+    assert get_version(o.history_outage, rows[1].pk).eta == "<2h"
+
+
+@pytest.mark.django_db
+def test_outage_history_deltas_keep_related(django_assert_num_queries):
+    o = get_outage()
+    o.eta = "<2h"
+    o.save()
+
+    history = o.history_outage.select_related("solution_assignee")
+    with django_assert_num_queries(1):
+        current, previous = latest_versions(history)
+        assert current.solution_assignee == previous.solution_assignee
+        assert current.solution_assignee.pk == o.solution_assignee_id
+
+
+@pytest.mark.django_db
+def test_outage_save_dirty_fields(django_assert_num_queries):
+    o = get_outage()
+    with django_assert_num_queries(0):
+        o.save()
+
+    o.communication_assignee_last_notified = arrow.now().datetime
+    o.next_update_due_at = o.get_next_update_due_at(
+        o.communication_assignee_last_notified
+    )
+    with django_assert_num_queries(1):
+        o.save()
+    assert o.history_outage.count() == 1, "Bookkeeping should not be in history"
+
+    o.summary = "changed summary"
+    o.save()
+    assert o.history_outage.first().changed_fields == ["summary"]
+
+
+@pytest.mark.django_db
+def test_outage_save_keeps_unsaved_fields_dirty():
+    o = get_outage()
+    o.summary = "changed summary"
+    o.resolved = False
+    o.save(update_fields=["summary"])
+    assert o.get_dirty_fields() == ["resolved"]
+
+    o.save()
+    o.refresh_from_db()
+    assert (o.summary, o.resolved) == ("changed summary", False)
+
+
+@pytest.mark.django_db
+def test_outage_as_of(settings):
+    settings.HISTORY_CHECKPOINT_INTERVAL = 1
+    o = get_outage()
+    for eta in ("<2h", "<8h", "<24h"):
+        o.eta = eta
+        o.save()
+    timestamps = list(
+        o.history_outage.order_by("pk").values_list("timestamp", flat=True)
+    )
+
+    assert o.as_of(timestamps[0] - timedelta(seconds=1)) is None
+    assert o.as_of(timestamps[2]).eta == "<8h"
+    assert o.as_of(timestamps[2]).summary == o.summary
+    versions = Outage.objects.as_of(timestamps[1], [o.pk, o.pk + 1])
+    assert list(versions) == [o.pk]
+    assert versions[o.pk].eta == "<2h"
+
+
+@pytest.mark.django_db
+def test_versions_as_of_same_timestamp(settings):
+    settings.HISTORY_CHECKPOINT_INTERVAL = 1
+    o = get_outage(with_solution=True)
+    for eta in ("<2h", "<8h"):
+        o.eta = eta
+        o.save()
+    timestamp = o.history_outage.first().timestamp
+    o.history_outage.update(timestamp=timestamp)
+
+    assert o.as_of(timestamp).eta == "<8h"
+    assert Outage.objects.as_of(timestamp, [o.pk])[o.pk].eta == "<8h"
+
+    solution = o.solution
+    solution.summary = "fixed"
+    solution.save()
+    created = solution.solution_history.first().created
+    versions = versions_as_of(
+        SolutionHistory, "solution_id", [solution.pk], created, field="created"
+    )
+    assert versions[solution.pk].summary == "fixed"
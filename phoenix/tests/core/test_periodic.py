@@ -0,0 +1,33 @@
+from phoenix.core import periodic
+from phoenix.core.redis import get_redis
+
+
+@periodic.single_run(timeout=10)
+def periodic_test_task(nested):
+    if nested:
+        assert periodic_test_task(nested=False) is None, "Overlapping run is skipped"
+    return 3
+
+
+def test_single_run_skips_overlapping_ticks():
+    name = "phoenix.tests.core.test_periodic.periodic_test_task"
+    get_redis().delete(periodic.RUNS_KEY.format(name))
+    get_redis().hdel(periodic.SKIPPED_KEY, name)
+
+    assert periodic_test_task(nested=True) == 3
+    assert periodic_test_task(nested=False) == 3, "Lock is released"
+    assert periodic.get_skipped()[name] == 1
+    assert [run["items"] for run in periodic.get_runs(name)] == [3, 3]
+
+
+@periodic.single_run(timeout=10)
+def periodic_flag_task():
+    return True
+
+
+def test_single_run_bool_result_not_items():
+    name = "phoenix.tests.core.test_periodic.periodic_flag_task"
+    get_redis().delete(periodic.RUNS_KEY.format(name))
+
+    assert periodic_flag_task() is True
+    assert periodic.get_runs(name)[0]["items"] is None
@@ -0,0 +1,28 @@
+from phoenix.core.routing import jump_consistent_hash, route_task
+
+ANNOUNCEMENT_TASK = "phoenix.slackbot.tasks.create_or_update_announcement"
+
+
+def test_jump_consistent_hash():
+    buckets = [jump_consistent_hash(key, 8) for key in range(1000)]
+    assert set(buckets) == set(range(8))
+    # growing number of partitions moves keys only into new partition
+    for key, bucket in enumerate(buckets):
+        new_bucket = jump_consistent_hash(key, 9)
+        assert new_bucket in (bucket, 8)
+
+
+def test_route_task_partitions(settings):
+    settings.OUTAGE_TASK_PARTITIONS = 4
+    route = route_task(ANNOUNCEMENT_TASK, (), {"outage_pk": 42}, {})
+    assert route == route_task(ANNOUNCEMENT_TASK, (42,), {}, {})
+    assert route["queue"].startswith("outages.")
+
+
+def test_route_task_queues(settings):
+    settings.OUTAGE_TASK_PARTITIONS = 0
+    route = route_task(ANNOUNCEMENT_TASK, (), {"outage_pk": 1}, {})
+    assert route == {"queue": "announcements"}
+    route = route_task("phoenix.slackbot.tasks.sync_users", (), {}, {})
+    assert route == {"queue": "sync"}
+    assert route_task("phoenix.slackbot.tasks.test_task", (), {}, {}) is None
@@ -0,0 +1,42 @@
+import time
+from unittest.mock import Mock, patch
+
+from phoenix.core import task_monitoring
+
+
+def busy_wait(seconds):
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        pass
+
+
+@patch("phoenix.core.task_monitoring.statsd")
+def test_slow_run_profiled(mocked_statsd, settings, tmp_path):
+    settings.TASK_PROFILE_THRESHOLD = 0.05
+    settings.TASK_PROFILE_SAMPLE_RATE = 1
+    settings.TASK_PROFILE_INTERVAL = 0.005
+    settings.TASK_PROFILE_DIR = str(tmp_path)
+    task = Mock()
+    task.name = "slow_task"
+
+    task_monitoring.start_run(task_id="1", task=task)
+    busy_wait(0.1)
+    task_monitoring.finish_run(task_id="1", task=task, state="SUCCESS")
+
+    name, runtime = mocked_statsd.histogram.call_args[0]
+    assert name == "phoenix.task.runtime" and runtime >= 0.1
+    profile = (tmp_path / "slow_task-1.txt").read_text()
+    assert "busy_wait" in profile.splitlines()[0]
+    assert task_monitoring.running == {}
+
+
+def test_revoked_run_forgotten(settings):
+    settings.TASK_PROFILE_THRESHOLD = 0.05
+    settings.TASK_PROFILE_SAMPLE_RATE = 1
+    task = Mock()
+
+    task_monitoring.start_run(task_id="1", task=task)
+    _, profiler = task_monitoring.running["1"]
+    task_monitoring.cancel_run(request=Mock(id="1"))
+    assert task_monitoring.running == {}
+    assert not profiler._thread.is_alive(), "Profiler thread should be stopped"
@@ -0,0 +1,38 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.utils import timezone
+
+from phoenix.core import timers
+from phoenix.core.redis import get_redis
+
+
+@patch("phoenix.core.celery.app.send_task")
+def test_timers_fire_once(mocked_send_task, settings):
+    settings.TIMERS_BATCH_SIZE = 2
+    get_redis().delete(timers.TIMERS_KEY, timers.PAYLOADS_KEY)
+    now = timezone.now()
+    for i in range(3):
+        timers.schedule(f"test:{i}", now - timedelta(minutes=i), "test_task", i)
+    timers.schedule("test:0", now + timedelta(hours=1), "test_task", 0)
+    timers.schedule("test:1", now, "test_task", 1, replace=False)
+    timers.schedule("test:3", now, "test_task", 3)
+    timers.cancel("test:3")
+
+    assert timers.dispatch() == 2
+    assert [call[1]["args"] for call in mocked_send_task.call_args_list] == [[2], [1]]
+    assert timers.dispatch() == 0
+    assert get_redis().zcard(timers.TIMERS_KEY) == 1
+
+
+@patch("phoenix.core.celery.app.send_task")
+def test_due_timer_restored_later(mocked_send_task):
+    get_redis().delete(timers.TIMERS_KEY, timers.PAYLOADS_KEY)
+    now = timezone.now()
+    # Timer was just popped, its task has not moved the deadline yet.
+    timers.schedule(
+        "test:0", now, "test_task", 0, replace=False, not_before=now + timedelta(1)
+    )
+
+    assert timers.dispatch() == 0
+    assert not mocked_send_task.called
@@ -0,0 +1,79 @@
+import datetime
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from phoenix.integration.gitlab import (
+    get_api,
+    get_due_date_issues,
+    get_issue,
+    get_issues_after_due_date,
+    sync_postmortem_issues,
+)
+
+
+@patch("phoenix.integration.gitlab.gitlab.Gitlab.http_get")
+def test_get_issue_is_single_request(mocked_http_get, settings):
+    settings.GITLAB_URL = "https://gitlab.example.com"
+    settings.GITLAB_PRIVATE_TOKEN = "token"
+    mocked_http_get.return_value = {"iid": 7, "title": "Postmortem"}
+
+    assert get_api() is get_api()
+    assert get_issue("group/project", 7).title == "Postmortem"
+
+    mocked_http_get.assert_called_once()
+    assert mocked_http_get.call_args[0][0] == "/projects/group%2Fproject/issues/7"
+
+
+def get_gitlab_issue(iid, due_in_days, state="opened", labels=(), updated="01"):
+    due_date = datetime.date.today() + datetime.timedelta(days=due_in_days)
+    return SimpleNamespace(
+        id=100 + iid,
+        iid=iid,
+        title=f"Postmortem {iid}",
+        description="",
+        web_url=f"https://gitlab.example.com/issues/{iid}",
+        state=state,
+        labels=list(labels),
+        due_date=due_date.isoformat(),
+        author={"id": 1, "username": "author"},
+        assignees=[{"id": 2, "username": "assignee", "name": "Assignee"}],
+        updated_at=f"2020-01-{updated}T10:00:00Z",
+    )
+
+
+@pytest.mark.django_db
+@patch("phoenix.integration.gitlab.postmortem_project")
+def test_sync_postmortem_issues(mocked_project, settings):
+    settings.GITLAB_POSTMORTEM_DAYS_TO_NOTIFY = [3, 7]
+    mocked_list = mocked_project.return_value.issues.list
+    mocked_list.return_value = [
+        get_gitlab_issue(1, 3),
+        get_gitlab_issue(2, -1),
+        get_gitlab_issue(3, -2, labels=["non-outage"]),
+        get_gitlab_issue(4, -3),
+    ]
+    assert sync_postmortem_issues() == 4
+    assert mocked_list.call_args[1]["state"] == "opened"
+
+    mocked_list.return_value = [get_gitlab_issue(4, -3, state="closed", updated="02")]
+    assert sync_postmortem_issues() == 1
+    assert mocked_list.call_args[1]["updated_after"] == "2020-01-01T10:00:00+00:00"
+
+    assert list(get_due_date_issues()) == [101]
+    assert [issue.iid for issue in get_issues_after_due_date()] == [2]
+
+
+@pytest.mark.django_db
+@patch("phoenix.integration.gitlab.postmortem_project")
+def test_full_sync_closes_deleted_issues(mocked_project):
+    mocked_list = mocked_project.return_value.issues.list
+    mocked_list.return_value = [get_gitlab_issue(1, -1), get_gitlab_issue(2, -1)]
+    sync_postmortem_issues()
+
+    # Issue 2 was deleted, it's missing in both incremental and full listing.
+    mocked_list.side_effect = [[], [get_gitlab_issue(1, -1)]]
+    assert sync_postmortem_issues(full=True) == 1
+    assert mocked_list.call_args[1]["state"] == "opened"
+    assert [issue.iid for issue in get_issues_after_due_date()] == [1]
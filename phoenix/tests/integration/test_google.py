@@ -0,0 +1,18 @@
+from unittest.mock import patch
+
+from phoenix.integration.google import get_discovery_document
+
+
+@patch("phoenix.integration.google.requests.get")
+def test_discovery_document_is_stored(mocked_get, settings, tmp_path):
+    settings.GOOGLE_DISCOVERY_DOCUMENT = str(tmp_path / "google" / "directory.json")
+    mocked_get.return_value.text = '{"name": "admin"}'
+    get_discovery_document.cache_clear()
+
+    assert get_discovery_document() == '{"name": "admin"}'
+    get_discovery_document.cache_clear()
+    assert get_discovery_document() == '{"name": "admin"}'
+
+    mocked_get.assert_called_once()
+    assert (tmp_path / "google" / "directory.json").read_text() == '{"name": "admin"}'
+    get_discovery_document.cache_clear()
@@ -0,0 +1,72 @@
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+import pytest
+
+from phoenix.outages.views import NOTIFICATIONS_PAGE_SIZE
+from phoenix.slackbot.snapshot import load_outage
+from phoenix.slackbot.tasks import generate_comments
+from phoenix.tests.utils import get_outage
+
+
+def count_detail_queries(client, outage):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(f"/outages/{outage.pk}")
+    assert response.status_code == 200
+    return len(context)
+
+
+@pytest.mark.django_db
+def test_outage_detail_constant_queries(admin_client, settings):
+    settings.STATICFILES_STORAGE = (
+        "django.contrib.staticfiles.storage.StaticFilesStorage"
+    )
+    outage = get_outage(with_solution=True)
+    outage.add_notifications(["first", "second"], outage.created_by)
+    queries = count_detail_queries(admin_client, outage)
+
+    outage.add_notifications(
+        [f"update {i}" for i in range(NOTIFICATIONS_PAGE_SIZE)], outage.created_by
+    )
+    assert count_detail_queries(admin_client, outage) == queries
+
+    cursor = outage.notifications.order_by("pk")[2].pk
+    response = admin_client.get(f"/outages/{outage.pk}/notifications?before={cursor}")
+    assert b"first" in response.content
+    assert b"second" in response.content
+    assert b"Load older" not in response.content
+
+
+@pytest.mark.django_db
+@patch("phoenix.slackbot.tasks.add_comment")
+@patch("phoenix.slackbot.signals.create_or_update_announcement.delay")
+def test_resolve_reopened_outage(mocked_delay, mocked_add_comment, admin_client):
+    mocked_add_comment.return_value = {"ok": True}
+    outage = get_outage(with_solution=True)
+    solution = outage.solution
+    solution.summary = "fixed"
+    solution.report_url = "https://example.com/report"
+    solution.resolved_at = datetime(2020, 1, 1, 10, tzinfo=timezone.utc)
+    solution.save()
+    outage.resolved = False
+    outage.save()
+
+    # Resolved again without changing the solution.
+    response = admin_client.post(
+        f"/outages/{outage.pk}/edit-solution",
+        {
+            "summary": "fixed",
+            "datepicker": "Jan 01, 2020",
+            "timepicker": "10:00 AM",
+            "timezone": "Etc/UTC",
+            "suggested_outcome": solution.suggested_outcome,
+            "report_url": solution.report_url,
+        },
+    )
+    assert response.status_code == 302
+    mocked_delay.assert_called_with(outage_pk=outage.pk, check_history=True)
+
+    generate_comments(load_outage(outage.pk))
+    assert "Outage has been resolved." in mocked_add_comment.call_args[0][2]
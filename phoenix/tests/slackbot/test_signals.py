@@ -21,6 +21,9 @@ def test_outage_changed(mocked_delay):
     outage.save()
     assert mocked_delay.call_count == 2  # called after change
 
+    outage.save()
+    assert mocked_delay.call_count == 2  # not called without change
+
 
 @pytest.mark.django_db
 @patch("phoenix.slackbot.signals.create_or_update_announcement.delay")
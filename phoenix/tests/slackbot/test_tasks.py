@@ -1,11 +1,27 @@
-from unittest.mock import patch
+from datetime import timedelta
+from unittest.mock import Mock, patch
 import arrow
 
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.utils import timezone
 import pytest
 
-from phoenix.core.models import Outage
-from phoenix.slackbot.tasks import notify_users
+from phoenix.core.models import Outage, Profile, Solution
+from phoenix.integration.models import GoogleGroup
+from phoenix.slackbot import outbox
+from phoenix.slackbot.models import SlackOutboxMessage
+from phoenix.slackbot.snapshot import load_outage
+from phoenix.slackbot.tasks import (
+    create_or_update_announcement,
+    generate_comments,
+    notify_communication_assignee,
+    notify_eta_deadline,
+    notify_users,
+    sync_user_groups_with_google,
+)
+from phoenix.tests.utils import get_outage
 
 
 @pytest.mark.django_db
@@ -28,3 +44,242 @@ def test_notify_users(mocked_api_call):
     outage.save()
     notify_users()
     assert mocked_api_call.call_count == 4, "Two users should have been notified"
+
+
+@pytest.mark.django_db
+@patch("phoenix.slackbot.tasks.timers")
+@patch("phoenix.slackbot.tasks.slack_bot_client.api_call")
+def test_notify_eta_deadline_repeated(mocked_api_call, mocked_timers):
+    outage = get_outage()
+    get_user_model().objects.update(last_name="unittest")
+    Outage.objects.filter(pk=outage.pk).update(resolved=False)
+    outage = Outage.objects.get(pk=outage.pk)
+    outage.set_eta("<30m")
+    outage.save()
+    deadline = outage.eta_deadline
+
+    notify_eta_deadline(outage.pk, (deadline - timedelta(hours=1)).isoformat())
+    assert mocked_api_call.call_count == 0, "Moved deadline is not reminded"
+    assert not mocked_timers.schedule.called
+    notify_eta_deadline(outage.pk, deadline.isoformat())
+    assert mocked_api_call.call_count == 2
+    key, due, task, *args = mocked_timers.schedule.call_args[0]
+    assert key == f"eta-reminder:{outage.pk}"
+    assert args == [outage.pk, deadline.isoformat()]
+
+
+@pytest.mark.django_db
+@patch("phoenix.slackbot.tasks.slack_bot_client.api_call")
+def test_notify_communication_assignee_due(mocked_api_call, django_assert_num_queries):
+    mocked_api_call.return_value = {"ok": True, "channel": {"id": "D1"}}
+    outage = get_outage()
+    get_user_model().objects.update(last_name="unittest")
+    Outage.objects.filter(pk=outage.pk).update(
+        resolved=False, next_update_due_at=arrow.utcnow().shift(minutes=-1).datetime
+    )
+    # savepoint, claim of due outages, release and update of notified ones
+    with django_assert_num_queries(5):
+        notify_communication_assignee()
+    assert mocked_api_call.call_count == 2
+    outage.refresh_from_db()
+    assert outage.next_update_due_at > arrow.utcnow().datetime
+
+    with django_assert_num_queries(3):
+        notify_communication_assignee()
+    assert mocked_api_call.call_count == 2, "Notified outage is not due"
+
+
+@pytest.mark.django_db
+@patch("phoenix.slackbot.tasks.timers")
+def test_notify_communication_assignee_retried(mocked_timers):
+    outage = get_outage()
+    due = arrow.utcnow().shift(minutes=-1).datetime
+    Outage.objects.filter(pk=outage.pk).update(resolved=False, next_update_due_at=due)
+
+    notify_communication_assignee([outage.pk])  # assignee without Slack ID
+    key, retry_at, task, args = mocked_timers.schedule.call_args[0]
+    assert key == f"update-request:{outage.pk}"
+    assert retry_at > arrow.utcnow().datetime
+    outage.refresh_from_db()
+    assert outage.next_update_due_at == retry_at, "Outage should be due at retry"
+    notify_communication_assignee([outage.pk])
+    assert mocked_timers.schedule.call_count == 1, "Claimed outage is not due"
+
+@pytest.mark.django_db
+@patch("phoenix.slackbot.tasks.group")
+@patch("phoenix.slackbot.tasks.slack_client.api_call")
+def test_announcement_side_effects_fanned_out(mocked_api_call, mocked_group):
+    mocked_api_call.return_value = {"ok": True, "ts": "1", "permalink": "link"}
+    outage = get_outage()
+    Outage.objects.filter(pk=outage.pk).update(resolved=False)
+    create_or_update_announcement(outage.pk)
+
+    side_effects = mocked_group.call_args[0][0]
+    assert [side_effect.task.split(".")[-1] for side_effect in side_effects] == [
+        "notify_assigned",
+        "notify_assigned",
+        "pin_message",
+    ]
+    mocked_group.return_value.apply_async.assert_called_once_with()
+
+
+@pytest.mark.django_db(transaction=True)
+@patch("phoenix.slackbot.outbox.schedule_dispatch")
+@patch("phoenix.slackbot.outbox.slack_client.api_call")
+def test_outbox_delivers_once(mocked_api_call, mocked_schedule, settings):
+    settings.SLACK_OUTBOX_CHANNEL_BURST = 1
+    mocked_api_call.return_value = {"ok": True}
+    with transaction.atomic():
+        outbox.enqueue("first", "channel", "first message")
+        outbox.enqueue("first", "channel", "first message")
+        outbox.enqueue("second", "channel", "second message")
+        assert not mocked_schedule.called, "Dispatch should wait for commit"
+    assert mocked_schedule.called
+
+    assert outbox.dispatch() == 1
+    assert outbox.dispatch() == 1
+    assert outbox.dispatch() == 0
+    assert [call[1]["text"] for call in mocked_api_call.call_args_list] == [
+        "first message",
+        "second message",
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+@patch("phoenix.slackbot.outbox.schedule_dispatch")
+@patch("phoenix.slackbot.outbox.slack_client.api_call")
+def test_outbox_expired_claim_not_posted_again(mocked_api_call, mocked_schedule):
+    outbox.enqueue("first", "channel", "first message")
+    assert mocked_schedule.call_count == 1
+    outbox.enqueue("first", "channel", "first message")
+    assert mocked_schedule.call_count == 1, "Recorded message should be skipped"
+
+    # Dispatcher posted the message and died before marking it as sent.
+    SlackOutboxMessage.objects.update(
+        claimed_until=timezone.now() - timedelta(seconds=1)
+    )
+    mocked_api_call.return_value = {
+        "ok": True,
+        "messages": [{"text": "first message", "ts": "1.2"}],
+    }
+    assert outbox.dispatch() == 1
+    assert mocked_api_call.call_args[0][0] == "conversations.history"
+    assert SlackOutboxMessage.objects.get().ts == "1.2"
+
+@pytest.mark.django_db
+@patch("phoenix.slackbot.outbox.schedule_dispatch")
+@patch("phoenix.slackbot.outbox.slack_client.api_call")
+def test_outbox_claims_and_retries_rate_limited(
+    mocked_api_call, mocked_schedule, settings
+):
+    mocked_api_call.return_value = {"ok": False, "error": "ratelimited"}
+    outbox.enqueue("first", "channel", "first message")
+
+    # Messages claimed by another dispatcher are skipped.
+    assert len(outbox.claim()) == 1
+    assert outbox.dispatch() == 0
+    assert not mocked_api_call.called
+
+    SlackOutboxMessage.objects.update(claimed_until=None)
+    assert outbox.dispatch() == 0
+    message = SlackOutboxMessage.objects.get()
+    assert (message.attempts, message.last_error) == (0, "ratelimited")
+    assert message.claimed_until is None
+    mocked_schedule.assert_called_with(countdown=settings.SLACK_OUTBOX_RETRY_DELAY)
+
+
+@pytest.mark.django_db
+@patch("phoenix.slackbot.tasks.add_comment")
+def test_generate_solution_comments(mocked_add_comment, django_assert_num_queries):
+    mocked_add_comment.return_value = {"ok": True}
+    outage = get_outage(with_solution=True)
+    outage.sales_affected_choice = Outage.NO
+    outage.save()
+    outage.solution.summary = "new summary"
+    outage.solution.save(modified_by=outage.created_by)
+    outage = load_outage(outage.pk)
+
+    # solution history, outage history and notification insert
+    with django_assert_num_queries(3):
+        generate_comments(outage)
+    comment = mocked_add_comment.call_args[0][2]
+    assert comment.startswith(
+        "Summary changed to: new summary.\nSales affected changed to: no."
+    )
+
+
+@pytest.mark.django_db
+@patch("phoenix.slackbot.tasks.add_comment")
+def test_generate_comments_repeated_solution_edit(mocked_add_comment):
+    mocked_add_comment.return_value = {"ok": True}
+    outage = get_outage()
+    outage.resolved = False
+    outage.save()
+    outage.resolved = True
+    outage.save()
+    Solution.objects.create(outage=outage, created_by=outage.created_by)
+
+    for summary in ("first", "second"):
+        outage = load_outage(outage.pk)
+        outage.save()
+        outage.solution.summary = summary
+        outage.solution.save(modified_by=outage.created_by)
+        generate_comments(load_outage(outage.pk))
+        comment = mocked_add_comment.call_args[0][2]
+        assert comment.startswith(f"Summary changed to: {summary}.\nby")
+
+
+@pytest.mark.django_db
+@patch("phoenix.slackbot.tasks.add_comment")
+def test_generate_outage_comments_single_post(mocked_add_comment):
+    mocked_add_comment.return_value = {"ok": True}
+    outage = get_outage()
+    Profile.objects.create(user=outage.created_by, slack_username="unittest")
+    Outage.objects.filter(pk=outage.pk).update(resolved=False)
+    outage = load_outage(outage.pk)
+    outage.set_eta("<2h")
+    outage.save(change_desc="More info", modified_by=outage.created_by)
+
+    generate_comments(outage)
+    assert mocked_add_comment.call_count == 1
+    options = mocked_add_comment.call_args[1]
+    assert [block["type"] for block in options["blocks"]] == ["context", "section"]
+    assert "username" not in options, "Field changes should be posted by bot"
+    assert [n.text for n in outage.notifications.order_by("pk")] == [
+        "More info",
+        "ETA changed to <2h.",
+    ]
+
+    outage = load_outage(outage.pk)
+    outage.save(change_desc="Only more info", modified_by=outage.created_by)
+    generate_comments(outage)
+    options = mocked_add_comment.call_args[1]
+    assert len(options["blocks"]) == 1
+    assert options["username"] == "unittest"
+
+
+@pytest.mark.django_db
+@patch("phoenix.integration.google.get_directory_api")
+def test_sync_user_groups_with_google(mocked_get_directory_api, settings):
+    settings.GOOGLE_SERVICE_ACCOUNT = {"type": "service_account"}
+    pages = {
+        ("first", None): {"members": [{"email": "a@kiwi.com"}], "nextPageToken": "2"},
+        ("first", "2"): {"members": [{"email": "b@kiwi.com"}]},
+        ("second", None): {"members": [{"email": "unknown@kiwi.com"}]},
+    }
+    mocked_list = mocked_get_directory_api.return_value.members.return_value.list
+    mocked_list.side_effect = lambda groupKey, pageToken: Mock(
+        execute=Mock(return_value=pages[groupKey, pageToken])
+    )
+    GoogleGroup.objects.create(name="first", key="first")
+    GoogleGroup.objects.create(name="second", key="second")
+    GoogleGroup.objects.create(name="ignored", key="ignored", is_allowed=False)
+    group = Group.objects.get_or_create(name="on_call")[0]
+    user_model = get_user_model()
+    user_model.objects.create(username="a", email="a@kiwi.com").groups.add(group)
+    user_model.objects.create(username="b", email="b@kiwi.com")
+    user_model.objects.create(username="left", email="left@kiwi.com").groups.add(group)
+
+    assert sync_user_groups_with_google() == 2
+
+    assert set(group.user_set.values_list("username", flat=True)) == {"a", "b"}
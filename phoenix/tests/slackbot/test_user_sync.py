@@ -0,0 +1,107 @@
+import itertools
+import time
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+import pytest
+
+from phoenix.core.models import Profile
+from phoenix.slackbot.models import SlackMember
+from phoenix.slackbot.tasks import sync_users
+from phoenix.slackbot.user_sync import prefetch
+from phoenix.slackbot.utils import get_slack_user
+from phoenix.slackbot.views import handle_user_change
+
+
+def get_member(slack_id, email, display_name="", is_bot=False):
+    return {
+        "id": slack_id,
+        "is_bot": is_bot,
+        "tz": "Europe/Prague",
+        "profile": {
+            "email": email,
+            "image_48": "https://image",
+            "display_name": display_name,
+            "real_name": slack_id,
+        },
+    }
+
+
+@pytest.mark.django_db
+@patch("phoenix.slackbot.user_sync.slack_client.api_call")
+def test_sync_users_writes_only_changes(
+    mocked_api_call, settings, django_assert_num_queries
+):
+    settings.ALLOWED_EMAIL_DOMAIN = None
+    user_model = get_user_model()
+    unchanged = user_model.objects.create(
+        username="U1", email="unchanged@kiwi.com", last_name="U1"
+    )
+    Profile.objects.create(
+        user=unchanged,
+        timezone="Europe/Prague",
+        image_48_url="https://image",
+        slack_username="U1",
+    )
+    SlackMember.objects.create(user=unchanged, slack_id="U1")
+    user_model.objects.create(username="U2", email="changed@kiwi.com")
+    mocked_api_call.return_value = {
+        "ok": True,
+        "members": [
+            get_member("U1", "unchanged@kiwi.com"),
+            get_member("U2", "changed@kiwi.com", display_name="changed"),
+            get_member("U3", "new@kiwi.com"),
+            get_member("B1", "bot@kiwi.com", is_bot=True),
+        ],
+    }
+
+    # Index of users and Slack IDs, savepoint, user insert and update,
+    # profile insert, Slack ID insert, release.
+    with django_assert_num_queries(8):
+        stats = sync_users()
+
+    assert stats == {"created": 1, "updated": 1, "unchanged": 1, "failed": 0}
+    new = user_model.objects.get(email="new@kiwi.com")
+    assert new.last_name == "U3" and new.profile.slack_username == "U3"
+    assert user_model.objects.get(username="U2").profile.slack_username == "changed"
+    assert set(SlackMember.objects.values_list("slack_id", flat=True)) == {
+        "U1",
+        "U2",
+        "U3",
+    }
+
+
+def test_prefetch_bounds_and_propagates_errors():
+    fetched = []
+
+    def produce():
+        for page in range(5):
+            fetched.append(page)
+            yield page
+        raise ValueError("failed")
+
+    pages = prefetch(produce(), 2)
+    assert next(pages) == 0
+    # Next pages are buffered, up to 2 of them besides the one in flight.
+    time.sleep(0.3)
+    assert fetched == [0, 1, 2, 3]
+    assert list(itertools.islice(pages, 4)) == [1, 2, 3, 4]
+    with pytest.raises(ValueError):
+        next(pages)
+
+
+@pytest.mark.django_db
+def test_user_change_updates_slack_member(settings, django_assert_num_queries):
+    settings.ALLOWED_EMAIL_DOMAIN = None
+    user = get_user_model().objects.create(
+        username="old", email="moved@kiwi.com", last_name="U1"
+    )
+    SlackMember.objects.create(user=user, slack_id="U1")
+
+    handle_user_change(None, {"event": {"user": get_member("U2", "moved@kiwi.com")}})
+
+    assert SlackMember.objects.get(user=user).slack_id == "U2"
+    assert user.profile.slack_username == "U2"
+    with django_assert_num_queries(1):
+        assert get_slack_user("U2") == user
+    assert get_slack_user("U1") is None
@@ -6,13 +6,15 @@ import json
 # Coala wants box import at the top, Pylint at the end.
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.sites.models import Site
 import pytest
 from rest_framework.response import Response
 import box
 
 from phoenix.slackbot import utils
-from phoenix.slackbot.message import generate_slack_message
+from phoenix.slackbot.message import generate_slack_message, render_slack_message
 from phoenix.slackbot.models import Announcement
+from phoenix.slackbot.snapshot import load_outage_snapshot
 from phoenix.tests.utils import get_outage
 
 
@@ -66,6 +68,19 @@ def test_generate_slack_message_dedicated_channel_id():
     assert "createchannel" not in action_names
 
 
+@pytest.mark.django_db
+def test_render_slack_message_from_snapshot(django_assert_num_queries):
+    outage = get_outage(with_solution=True)
+    Site.objects.get_current()  # current site is cached after first lookup
+
+    with django_assert_num_queries(1):
+        snapshot = load_outage_snapshot(outage.pk)
+    with django_assert_num_queries(0):
+        attachment = render_slack_message(snapshot)[0]
+    assert attachment["color"] == "good"
+    assert attachment["title"] == "Resolved Unittest-system incident"
+
+
 def test_verify_token():
     def test_func(*args, **kwargs):
         return args, kwargs